@@ -1,14 +1,47 @@
-from flask import Flask, request, jsonify
-import os, requests, shutil
-from validator import run_validation
-from github_uploader import upload_folder_to_github
+from flask import Flask, Response, request, jsonify
+import os, re, hmac, json, zlib, asyncio, itertools, mimetypes, requests, threading, multiprocessing
+# validator (pandas, numpy, openpyxl) is imported inside the functions that
+# run validations: /health, /dashboard and the listings never load it, and
+# a worker pays for it on its first validation. gunicorn.conf.py can load
+# it once in the master instead (GUNICORN_PRELOAD=1).
+from run_layout import (
+    DEFAULT_FORMATS,
+    OUTPUT_FORMATS,
+    META_JSON,
+    STATE_JSON,
+    MATCHED_EXCEL,
+    PROFILE_STACKS,
+    PROFILE_TOP
+)
 from dotenv import load_dotenv
-from github_uploader import (
-    upload_folder_to_github,
-    delete_folder_recursive,
-    get_folder_contents
+from utils.fetch_json import fetch_all_json, fetch_all_json_async, fetch_each_json
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from job_queue import JobQueue, QueueFullError
+from result_cache import ResultCache, input_key
+from metrics import StageTimer, Gauge, register, render_metrics
+from manifest import (
+    BASE_PATH,
+    ManifestCache,
+    add_run,
+    add_runs,
+    remove_runs,
+    filter_runs
+)
+from storage import create_storage, RunNotFoundError
+from async_pipeline import AsyncRunner, timed_call
+from profiler import StackSampler
+from run_archive import (
+    ARCHIVE_NAME,
+    pack_run,
+    open_archive,
+    archive_index,
+    member_size,
+    read_member,
+    iter_member,
+    iter_range,
+    parse_range
 )
-from utils.fetch_json import fetch_github_json
 
 from flask import render_template
 # ==========================================
@@ -21,8 +54,109 @@ GITHUB_TOKEN = os.getenv("GITHUB_TOKEN")
 GITHUB_REPO = os.getenv("GITHUB_REPO")
 API_KEY = os.getenv("API_KEY")
 
+# Where run artifacts go: "github" (GITHUB_REPO) or "local" (a directory,
+# LOCAL_STORAGE_DIR, e.g. on shared disk; no network involved).
+STORAGE_BACKEND = os.getenv("STORAGE_BACKEND", "github")
+LOCAL_STORAGE_DIR = os.getenv("LOCAL_STORAGE_DIR", "validation_storage")
+
+# Background validation jobs: VALIDATION_WORKERS run at once and up to
+# VALIDATION_QUEUE_LIMIT more may wait before submissions get a 429.
+VALIDATION_WORKERS = int(os.getenv("VALIDATION_WORKERS", "2"))
+VALIDATION_QUEUE_LIMIT = int(os.getenv("VALIDATION_QUEUE_LIMIT", "8"))
+JOB_TTL_SECONDS = int(os.getenv("JOB_TTL_SECONDS", "3600"))
+JOB_RETRY_AFTER = 30
+
+# VALIDATION_PROCESSES > 1 shards matching by VALIDATION_SHARD_WINDOW
+# (a pandas offset such as "1D" or "4h") across a process pool.
+VALIDATION_PROCESSES = int(os.getenv("VALIDATION_PROCESSES", "0"))
+VALIDATION_SHARD_WINDOW = os.getenv("VALIDATION_SHARD_WINDOW", "1D")
+
+# VALIDATION_LOW_MEMORY=1 keeps lean, compact frames and parses, matches
+# and exports in chunks once the input outgrows VALIDATION_MEMORY_BUDGET_MB.
+# A request can also opt in with "low_memory": true.
+VALIDATION_LOW_MEMORY = os.getenv("VALIDATION_LOW_MEMORY", "0") == "1"
+VALIDATION_MEMORY_BUDGET_MB = float(os.getenv("VALIDATION_MEMORY_BUDGET_MB", "256"))
+
+# VALIDATION_ASYNC_IO=1 runs validations on an event loop: fetches and
+# uploads are awaited concurrently and the validation itself goes to a pool
+# of ASYNC_CPU_WORKERS processes, so one worker keeps up to
+# ASYNC_MAX_IN_FLIGHT validations in flight. A request can also opt in with
+# "async_io": true.
+VALIDATION_ASYNC_IO = os.getenv("VALIDATION_ASYNC_IO", "0") == "1"
+ASYNC_CPU_WORKERS = int(os.getenv("ASYNC_CPU_WORKERS", str(os.cpu_count() or 1)))
+ASYNC_MAX_IN_FLIGHT = int(os.getenv("ASYNC_MAX_IN_FLIGHT", "32"))
+
+# VALIDATION_ARCHIVE=1 stores each run as one zip (run.zip) instead of one
+# file per artifact; /runs/<folder>/files/<member> serves its members. A
+# request can also choose with "archive": true/false.
+VALIDATION_ARCHIVE = os.getenv("VALIDATION_ARCHIVE", "0") == "1"
+
+# VALIDATION_INCREMENTAL=1 stores validation_state.json with each run so
+# later requests can extend it with "append_to". The state holds copies of
+# the result tables, so it is off by default; a request can also choose
+# with "incremental": true/false.
+VALIDATION_INCREMENTAL = os.getenv("VALIDATION_INCREMENTAL", "0") == "1"
+
+# "profile": true (with the API_KEY value in an X-API-Key header) samples
+# the request's validation and upload every PROFILE_INTERVAL_MS and saves
+# the profile next to the run's artifacts.
+PROFILE_INTERVAL_MS = float(os.getenv("PROFILE_INTERVAL_MS", "5"))
+PROFILE_TOP_N = int(os.getenv("PROFILE_TOP_N", "25"))
+# Reported on their own in every profile: the matching (run_validation
+# and what replaced it on the in-memory path), the Excel export
+# (save_excel / excel_bytes) and the storage upload.
+PROFILE_FOCUS = {
+    "validation": ("run_validation", "match_signals", "match_signals_sharded", "match_signals_chunked"),
+    "excel": ("save_excel", "excel_bytes", "excel_bytes_streaming"),
+    "upload": ("upload", "upload_artifacts_to_github")
+}
+
+# /validate-batch: at most BATCH_MAX_ITEMS triples per call, validated
+# BATCH_WORKERS at a time in a process pool, with BATCH_FETCH_WORKERS
+# downloads in flight.
+BATCH_MAX_ITEMS = int(os.getenv("BATCH_MAX_ITEMS", "100"))
+BATCH_WORKERS = int(os.getenv("BATCH_WORKERS", str(os.cpu_count() or 1)))
+BATCH_FETCH_WORKERS = int(os.getenv("BATCH_FETCH_WORKERS", "10"))
+
+# Identical inputs within RESULT_CACHE_TTL seconds reuse the earlier run.
+RESULT_CACHE_SIZE = int(os.getenv("RESULT_CACHE_SIZE", "128"))
+RESULT_CACHE_TTL = int(os.getenv("RESULT_CACHE_TTL", "86400"))
+
+# /list-validations serves the run manifest from memory for this long.
+MANIFEST_CACHE_TTL = int(os.getenv("MANIFEST_CACHE_TTL", "60"))
+LIST_PAGE_SIZE = 50
+LIST_MAX_PAGE_SIZE = 500
+
+# The name of one run's folder under BASE_PATH.
+RUN_FOLDER = re.compile(r"validation_\d{8}_\d{6}")
+
 app = Flask(__name__)
 
+job_queue = JobQueue(
+    max_workers=VALIDATION_WORKERS,
+    max_pending=VALIDATION_QUEUE_LIMIT,
+    job_ttl=JOB_TTL_SECONDS
+)
+
+result_cache = ResultCache(
+    max_entries=RESULT_CACHE_SIZE,
+    ttl=RESULT_CACHE_TTL
+)
+
+manifest_cache = ManifestCache(ttl=MANIFEST_CACHE_TTL)
+
+async_runner = AsyncRunner(
+    cpu_workers=ASYNC_CPU_WORKERS,
+    max_in_flight=ASYNC_MAX_IN_FLIGHT
+)
+
+storage = create_storage(
+    STORAGE_BACKEND,
+    repo=GITHUB_REPO,
+    token=GITHUB_TOKEN,
+    local_root=LOCAL_STORAGE_DIR
+)
+
 
 # ==========================================
 # HOME ROUTE
@@ -40,6 +174,17 @@ def ui():
 @app.route("/dashboard")
 def dashboard():
     return render_template("dashboard.html")
+
+def refresh_manifest_cache(result):
+
+    # The write that just went through carried the new manifest; reuse it
+    # instead of reading it back from storage.
+    if "manifest" in result:
+        manifest_cache.set(result.pop("manifest"))
+    else:
+        manifest_cache.invalidate()
+
+
 # ==========================================
 # DELETE ONE FOLDER
 # ==========================================
@@ -47,18 +192,24 @@ def dashboard():
 @app.route("/delete/<folder_name>", methods=["DELETE"])
 def delete_one(folder_name):
 
+    if not RUN_FOLDER.fullmatch(folder_name):
+        return jsonify({"error": "folder_name must be a validation_<timestamp> folder"}), 400
+
     try:
-        full_path = f"validation_results/{folder_name}"
+        full_path = f"{BASE_PATH}/{folder_name}"
 
-        delete_folder_recursive(
-            repo=GITHUB_REPO,
-            token=GITHUB_TOKEN,
-            folder_path=full_path
+        deleted = storage.delete(full_path, remove_runs(full_path))
+
+        refresh_manifest_cache(deleted)
+
+        result_cache.invalidate(
+            lambda result: result["folder_path"] == full_path
         )
 
         return jsonify({
             "status": "success",
-            "deleted_folder": folder_name
+            "deleted_folder": folder_name,
+            **deleted
         })
 
     except Exception as e:
@@ -73,23 +224,576 @@ def delete_one(folder_name):
 def delete_all():
 
     try:
-        base_path = "validation_results"
+        deleted = storage.delete(BASE_PATH, remove_runs(BASE_PATH))
 
-        delete_folder_recursive(
-            repo=GITHUB_REPO,
-            token=GITHUB_TOKEN,
-            folder_path=base_path
-        )
+        refresh_manifest_cache(deleted)
+
+        result_cache.invalidate(lambda result: True)
 
         return jsonify({
             "status": "success",
-            "message": "All validation folders deleted"
+            "message": "All validation folders deleted",
+            **deleted
         })
 
     except Exception as e:
         return jsonify({"error": str(e)}), 500
 
 
+# ==========================================
+# VALIDATION PIPELINE
+# ==========================================
+
+def build_response(uploaded_files, timestamp, members=None):
+
+    # members: the artifacts inside an archived run (uploaded_files is then
+    # just its run.zip); they are linked through /runs/<folder>/files/.
+    if members:
+        raw_urls = [f"/runs/validation_{timestamp}/files/{name}" for name in members]
+    else:
+        raw_urls = [storage.file_url(path) for path in uploaded_files]
+
+    # Find matched signals file
+    matched_signals_url = next(
+        (url for url in raw_urls if "matched_signals.xlsx" in url),
+        None
+    )
+
+    matched_json_url = next(
+        (url for url in raw_urls if "matched_signals.json" in url),
+        None
+    )
+
+    meta_json_url = next(
+        (url for url in raw_urls if "validation_meta.json" in url),
+        None
+    )
+
+    matched_parquet_url = next(
+        (url for url in raw_urls if "matched_signals.parquet" in url),
+        None
+    )
+
+    folder_path = f"{BASE_PATH}/validation_{timestamp}"
+    folder_url = storage.folder_url(folder_path)
+
+    response = {
+        "status": "success",
+        "storage": storage.name,
+        "repo": storage.location,
+        "folder_path": folder_path,
+        "folder_url": folder_url,
+        "matched_signals_url": matched_signals_url,
+        "matched_json_url": matched_json_url,
+        "meta_json_url": meta_json_url,
+        "matched_parquet_url": matched_parquet_url,
+        "files": raw_urls
+    }
+
+    if members:
+        response["archive_url"] = storage.file_url(f"{folder_path}/{ARCHIVE_NAME}")
+        response["archive_index_url"] = f"/runs/validation_{timestamp}/archive/index"
+
+    return response
+
+
+def parse_run_options(data):
+
+    # Per-request switches shared by both validation routes.
+    formats = data.get("formats") or list(DEFAULT_FORMATS)
+
+    if not isinstance(formats, list) or set(formats) - set(OUTPUT_FORMATS):
+        raise ValueError(f"formats must be a list drawn from {', '.join(OUTPUT_FORMATS)}")
+
+    # stream: answer with the records as gzip NDJSON while matching runs
+    # (see STREAMED RESPONSES); persist: false skips storing the run.
+    stream = bool(data.get("stream"))
+
+    if stream and data.get("append_to"):
+        raise ValueError("stream cannot be combined with append_to")
+
+    # profile: sample the run (see REQUEST PROFILING). A profiled run is
+    # never answered from the cache and stays on the blocking path, where
+    # the sampled thread does the work.
+    profile = bool(data.get("profile"))
+
+    if profile and stream:
+        raise ValueError("profile cannot be combined with stream")
+
+    # append_to: "validation_<timestamp>" of an existing run to extend
+    # with newer trades instead of creating a new run.
+    append_to = data.get("append_to")
+
+    if append_to:
+        match = re.fullmatch(r"(?:validation_results/)?validation_(\d{8}_\d{6})/?", str(append_to))
+        if not match:
+            raise ValueError("append_to must name a validation_<timestamp> folder")
+        append_to = match.group(1)
+
+    return {
+        "use_cache": not data.get("no_cache") and not profile,
+        "formats": tuple(f for f in OUTPUT_FORMATS if f in formats),
+        "append_to": append_to,
+        "low_memory": bool(data.get("low_memory", VALIDATION_LOW_MEMORY)),
+        "async_io": bool(data.get("async_io", VALIDATION_ASYNC_IO)) and not profile,
+        "stream": stream,
+        "persist": bool(data.get("persist", True)),
+        "archive": bool(data.get("archive", VALIDATION_ARCHIVE)),
+        "incremental": bool(data.get("incremental", VALIDATION_INCREMENTAL)),
+        "profile": profile
+    }
+
+
+def run_cache_key(ce_data, pe_data, index_data, options):
+
+    key = input_key(ce_data, pe_data, index_data) + ":" + ",".join(options["formats"])
+
+    if options["incremental"]:
+        key += ":incremental"
+
+    return key + ":archive" if options["archive"] else key
+
+
+def validation_options(options):
+    return {
+        "processes": VALIDATION_PROCESSES,
+        "shard_window": VALIDATION_SHARD_WINDOW,
+        "formats": options["formats"],
+        "low_memory": options["low_memory"],
+        "memory_budget_mb": VALIDATION_MEMORY_BUDGET_MB,
+        "incremental": options["incremental"]
+    }
+
+
+def prepare_upload(artifacts, options, timer):
+
+    # -> (files to store, meta for the manifest, archive members or None)
+    meta = json.loads(artifacts[META_JSON])
+
+    if not options["archive"]:
+        return artifacts, meta, None
+
+    with timer.stage("archive"):
+        packed = {ARCHIVE_NAME: pack_run(artifacts)}
+
+    meta["archive"] = ARCHIVE_NAME
+
+    return packed, meta, list(artifacts)
+
+
+def store_result(stored, cache_key, members=None):
+
+    refresh_manifest_cache(stored)
+
+    response_data = build_response(stored["files"], stored["timestamp"], members)
+
+    result_cache.put(cache_key, response_data)
+
+    return response_data
+
+
+def validate_and_upload(ce_data, pe_data, index_data, options, timer=None):
+
+    from validator import build_validation_artifacts
+
+    timer = timer or StageTimer()
+
+    if options["profile"]:
+        return profiled(validate_and_upload, ce_data, pe_data, index_data, {**options, "profile": False}, timer)
+
+    if options["append_to"]:
+        return append_and_upload(ce_data, pe_data, index_data, options, timer)
+
+    # ==========================
+    # REUSE AN EARLIER IDENTICAL RUN
+    # ==========================
+
+    cache_key = run_cache_key(ce_data, pe_data, index_data, options)
+
+    if options["use_cache"]:
+        cached = result_cache.get(cache_key)
+
+        if cached:
+            return {**cached, "cached": True}
+
+    # ==========================
+    # RUN VALIDATION
+    # ==========================
+
+    artifacts = build_validation_artifacts(
+        ce_data, pe_data, index_data, timer,
+        **validation_options(options)
+    )
+
+    # ==========================
+    # STORE ARTIFACTS
+    # ==========================
+
+    artifacts, meta, members = prepare_upload(artifacts, options, timer)
+
+    with timer.stage("upload"):
+        stored = storage.upload(artifacts, add_run(meta))
+
+    return store_result(stored, cache_key, members)
+
+
+async def validate_and_upload_async(ce_data, pe_data, index_data, options, timer=None):
+
+    # validate_and_upload on the event loop (async_runner).
+    from validator import build_validation_artifacts
+
+    timer = timer or StageTimer()
+
+    # Appends keep their per-run lock and stay on the blocking path.
+    if options["append_to"]:
+        return await asyncio.to_thread(append_and_upload, ce_data, pe_data, index_data, options, timer)
+
+    cache_key = run_cache_key(ce_data, pe_data, index_data, options)
+
+    if options["use_cache"]:
+        cached = result_cache.get(cache_key)
+
+        if cached:
+            return {**cached, "cached": True}
+
+    artifacts, pool_timer = await async_runner.run_cpu(
+        timed_call, build_validation_artifacts, timer,
+        ce_data, pe_data, index_data,
+        **validation_options(options)
+    )
+
+    timer.adopt(pool_timer)
+
+    artifacts, meta, members = prepare_upload(artifacts, options, timer)
+
+    with timer.stage("upload"):
+        stored = await storage.upload_async(artifacts, add_run(meta))
+
+    return store_result(stored, cache_key, members)
+
+
+# Appends to one run are serialised so each one starts from the state the
+# previous one wrote (per process).
+append_locks = {}
+append_locks_guard = threading.Lock()
+
+
+def append_lock(timestamp):
+    with append_locks_guard:
+        return append_locks.setdefault(timestamp, threading.Lock())
+
+
+def read_run_file(folder_path, name):
+
+    # -> (content or None, whether the run is archived)
+    reader = storage.open_reader(f"{folder_path}/{ARCHIVE_NAME}")
+
+    if reader is None:
+        return storage.read(f"{folder_path}/{name}"), False
+
+    with reader, open_archive(reader) as archive:
+        return read_member(archive, name), True
+
+
+def append_and_upload(ce_data, pe_data, index_data, options, timer):
+
+    from validator import build_incremental_artifacts
+
+    timestamp = options["append_to"]
+
+    folder_path = f"{BASE_PATH}/validation_{timestamp}"
+
+    with append_lock(timestamp):
+
+        with timer.stage("state"):
+            state, archived = read_run_file(folder_path, STATE_JSON)
+
+        if state is None:
+            raise RunNotFoundError(
+                f"No incremental state found for {folder_path}; "
+                "only runs validated with \"incremental\": true can be appended to"
+            )
+
+        artifacts = build_incremental_artifacts(
+            json.loads(state), ce_data, pe_data, index_data, timer,
+            low_memory=options["low_memory"]
+        )
+
+        # The run keeps its layout: an archived run is re-archived, loose
+        # files stay loose.
+        artifacts, meta, members = prepare_upload(artifacts, {**options, "archive": archived}, timer)
+
+        with timer.stage("upload"):
+            stored = storage.upload(artifacts, add_run(meta), timestamp=timestamp)
+
+    refresh_manifest_cache(stored)
+
+    # Cached responses for this run now describe outdated files.
+    result_cache.invalidate(lambda result: result.get("folder_path") == folder_path)
+
+    return {
+        **build_response(stored["files"], stored["timestamp"], members),
+        "appended": {
+            key: meta[key] for key in (
+                "previous_watermarks",
+                "appended_ce_entries",
+                "appended_pe_entries",
+                "appended_index_entries"
+            )
+        },
+        "total_valid_matches": meta["total_valid_matches"]
+    }
+
+
+def fetch_sources(ce_url, pe_url, index_url, timer):
+
+    # ==========================
+    # FETCH RAW JSON SAFELY
+    # ==========================
+
+    with timer.stage("fetch"):
+        fetched = fetch_all_json({
+            "CE": ce_url,
+            "PE": pe_url,
+            "INDEX": index_url
+        })
+
+    return fetched["CE"], fetched["PE"], fetched["INDEX"]
+
+
+def fetch_validate_and_upload(ce_url, pe_url, index_url, options):
+
+    timer = StageTimer()
+
+    ce_data, pe_data, index_data = fetch_sources(ce_url, pe_url, index_url, timer)
+
+    return validate_and_upload(ce_data, pe_data, index_data, options, timer)
+
+
+async def fetch_validate_and_upload_async(ce_url, pe_url, index_url, options):
+
+    timer = StageTimer()
+
+    with timer.stage("fetch"):
+        fetched = await fetch_all_json_async({
+            "CE": ce_url,
+            "PE": pe_url,
+            "INDEX": index_url
+        })
+
+    return await validate_and_upload_async(
+        fetched["CE"], fetched["PE"], fetched["INDEX"], options, timer
+    )
+
+
+# ==========================================
+# REQUEST PROFILING
+# ==========================================
+#
+# For a request that is slow in production: "profile": true plus the
+# admin key runs it under a StackSampler (profiler.py), which samples the
+# validation (run_validation, save_excel, ...) and the upload from a side
+# thread without tracing them. Two files are added to the run:
+#
+#   profile/stacks.collapsed        flame graph input (flamegraph.pl,
+#                                   speedscope), microseconds per stack
+#   profile/top_functions.json      top PROFILE_TOP_N functions by self
+#                                   and total time, and PROFILE_FOCUS totals
+#
+# and linked from the response under "profile".
+
+def admin_request():
+
+    # Profiling stays off unless API_KEY is set.
+    key = request.headers.get("X-API-Key", "")
+
+    return bool(API_KEY) and hmac.compare_digest(key.encode(), API_KEY.encode())
+
+
+def profiled(fn, *args):
+
+    sampler = StackSampler(interval=PROFILE_INTERVAL_MS / 1000)
+
+    with sampler:
+        result = fn(*args)
+
+    report = sampler.report(top=PROFILE_TOP_N, focus=PROFILE_FOCUS)
+
+    timestamp = result["folder_path"].rsplit("validation_", 1)[1]
+
+    stored = storage.attach(timestamp, {
+        PROFILE_STACKS: sampler.collapsed().encode(),
+        PROFILE_TOP: json.dumps(report, indent=2).encode()
+    })
+
+    stacks_path, top_path = stored["files"]
+
+    return {
+        **result,
+        "profile": {
+            "stacks_url": storage.file_url(stacks_path),
+            "top_functions_url": storage.file_url(top_path),
+            "samples": report["samples"],
+            "wall_seconds": report["wall_seconds"],
+            "overhead_seconds": report["overhead_seconds"],
+            "focus_seconds": report["focus_seconds"]
+        }
+    }
+
+
+# ==========================================
+# STREAMED RESPONSES
+# ==========================================
+#
+# With "stream": true the matched, CE-unmatched and PE-unmatched records are
+# sent as NDJSON lines while matching runs, one chunk of CE rows at a time,
+# gzip-compressed when the client accepts it:
+#
+#   {"type": "matched", "record": {...}}
+#   {"type": "ce_unmatched", "record": {...}}
+#   {"type": "pe_unmatched", "record": {...}}
+#   {"type": "summary", "total_valid_matches": ..., "persist": {...}}
+#
+# Nothing is uploaded while the stream runs. Unless "persist": false, the
+# finished run is then stored by a background job whose status URL is in
+# the summary line. An error after the first byte ends the stream with
+# {"type": "error", "error": ...}.
+
+NDJSON_MIMETYPE = "application/x-ndjson"
+
+
+def ndjson_records(kind, df):
+
+    # Same value encoding as matched_signals.json.
+    if df.empty:
+        return ""
+
+    lines = df.to_json(orient="records", lines=True).splitlines()
+
+    return "".join(f'{{"type": "{kind}", "record": {line}}}\n' for line in lines if line)
+
+
+def gzip_stream(chunks):
+
+    # Every chunk is flushed so the client can decode it on arrival.
+    compressor = zlib.compressobj(wbits=31)
+
+    for chunk in chunks:
+        data = compressor.compress(chunk.encode()) + compressor.flush(zlib.Z_SYNC_FLUSH)
+        if data:
+            yield data
+
+    yield compressor.flush()
+
+
+def persist_run(run, options, timer, cache_key):
+
+    from validator import build_artifacts
+
+    artifacts = build_artifacts(**run, timer=timer, formats=options["formats"])
+
+    artifacts, meta, members = prepare_upload(artifacts, options, timer)
+
+    with timer.stage("upload"):
+        stored = storage.upload(artifacts, add_run(meta))
+
+    return store_result(stored, cache_key, members)
+
+
+def stream_summary(run, options, timer, cache_key):
+
+    legs = run["legs"]
+    matches = len(run["matched_df"])
+
+    summary = {
+        "type": "summary",
+        "total_ce_entries": legs["total_ce_entries"],
+        "total_pe_entries": legs["total_pe_entries"],
+        "total_index_entries": legs["total_index_entries"],
+        "total_valid_matches": matches,
+        "ce_unmatched": len(run["ce_unmatched"]),
+        "pe_unmatched": len(run["pe_unmatched"]),
+        "match_percentage": round(matches / legs["total_ce_entries"] * 100, 2) if legs["total_ce_entries"] else 0,
+        "persist": None
+    }
+
+    if options["persist"]:
+        try:
+            job_id = job_queue.submit(persist_run, run, options, timer, cache_key)
+            summary["persist"] = {
+                "job_id": job_id,
+                "status_url": f"/jobs/{job_id}",
+                "result_url": f"/jobs/{job_id}/result"
+            }
+        except QueueFullError as e:
+            summary["persist"] = {"error": str(e)}
+
+    return summary
+
+
+def stream_response(ce_data, pe_data, index_data, options, timer=None):
+
+    from validator import stream_validation
+
+    timer = timer or StageTimer()
+    cache_key = run_cache_key(ce_data, pe_data, index_data, options)
+
+    pieces = stream_validation(ce_data, pe_data, index_data, timer, incremental=options["incremental"])
+
+    # Parsing happens before the first piece, so bad input still gets a
+    # plain error response instead of a broken stream.
+    first = next(pieces)
+
+    def lines():
+
+        try:
+            for kind, piece in itertools.chain([first], pieces):
+
+                if kind == "run":
+                    yield json.dumps(stream_summary(piece, options, timer, cache_key)) + "\n"
+                else:
+                    yield ndjson_records(kind, piece)
+
+        except Exception as e:
+            yield json.dumps({"type": "error", "error": str(e)}) + "\n"
+
+    if "gzip" in request.headers.get("Accept-Encoding", ""):
+        response = Response(gzip_stream(lines()), mimetype=NDJSON_MIMETYPE)
+        response.headers["Content-Encoding"] = "gzip"
+    else:
+        response = Response((line.encode() for line in lines()), mimetype=NDJSON_MIMETYPE)
+
+    response.headers["Vary"] = "Accept-Encoding"
+
+    return response
+
+
+def queue_full_response(error):
+    response = jsonify({"error": str(error)})
+    response.headers["Retry-After"] = str(JOB_RETRY_AFTER)
+    return response, 429
+
+
+def submit_job(fn, *args, runner=None):
+
+    # With a runner, fn is a coroutine function run on its event loop.
+    try:
+        if runner:
+            job_id = job_queue.submit_async(runner, fn, *args)
+        else:
+            job_id = job_queue.submit(fn, *args)
+
+    except QueueFullError as e:
+        return queue_full_response(e)
+
+    return jsonify({
+        "status": "queued",
+        "job_id": job_id,
+        "status_url": f"/jobs/{job_id}",
+        "result_url": f"/jobs/{job_id}/result"
+    }), 202
+
+
 # ==========================================
 # VALIDATE ROUTE
 # ==========================================
@@ -97,8 +801,6 @@ def delete_all():
 @app.route("/validate", methods=["POST"])
 def validate():
 
-    output_folder = None
-
     try:
         data = request.get_json()
 
@@ -109,74 +811,52 @@ def validate():
         pe_data = data.get("pe_data")
         index_data = data.get("index_data")
 
-        if not ce_data or not pe_data or not index_data:
+        try:
+            options = parse_run_options(data)
+        except ValueError as e:
+            return jsonify({"error": str(e)}), 400
+
+        if options["profile"] and not admin_request():
+            return jsonify({"error": "profile requires the admin key in X-API-Key"}), 403
+
+        # Appends may bring no new trades for some legs.
+        if options["append_to"]:
+            complete = all(isinstance(d, list) for d in (ce_data, pe_data, index_data))
+        else:
+            complete = ce_data and pe_data and index_data
+
+        if not complete:
             return jsonify({"error": "Missing JSON data"}), 400
 
-        # ==========================
-        # RUN VALIDATION
-        # ==========================
-
-        validation_result = run_validation(ce_data, pe_data, index_data)
-        output_folder = validation_result["base_directory"]
-                
-        # ==========================
-        # UPLOAD TO GITHUB
-        # ==========================
-
-        uploaded_files, timestamp = upload_folder_to_github(
-            folder_path=output_folder,
-            repo=GITHUB_REPO,
-            token=GITHUB_TOKEN
-        )
+        if options["stream"]:
+            return stream_response(ce_data, pe_data, index_data, options)
 
-        # ==========================
-        # BUILD RAW URLS
-        # ==========================
+        if options["async_io"]:
 
-        raw_base = f"https://raw.githubusercontent.com/{GITHUB_REPO}/main/"
-        raw_urls = [raw_base + path for path in uploaded_files]
+            if data.get("async"):
+                return submit_job(
+                    validate_and_upload_async, ce_data, pe_data, index_data, options,
+                    runner=async_runner
+                )
 
-        # Find matched signals file
-        matched_signals_url = next(
-            (raw_base + p for p in uploaded_files if "matched_signals.xlsx" in p),
-            None
-        )
+            return jsonify(async_runner.run(
+                validate_and_upload_async(ce_data, pe_data, index_data, options)
+            ))
 
-        matched_json_url = next(
-            (raw_base + p for p in uploaded_files if "matched_signals.json" in p),
-            None
-        )
+        if data.get("async"):
+            return submit_job(validate_and_upload, ce_data, pe_data, index_data, options)
 
-        meta_json_url = next(
-            (raw_base + p for p in uploaded_files if "validation_meta.json" in p),
-            None
-        )
-        
-        
-        folder_path = f"validation_results/validation_{timestamp}"
-        folder_url = f"https://github.com/{GITHUB_REPO}/tree/main/{folder_path}"
+        return jsonify(validate_and_upload(ce_data, pe_data, index_data, options))
 
-        response_data = {
-            "status": "success",
-            "repo": GITHUB_REPO,
-            "folder_path": folder_path,
-            "folder_url": folder_url,
-            "matched_signals_url": matched_signals_url,
-            "matched_json_url": matched_json_url,
-            "meta_json_url": meta_json_url,
-            "files": raw_urls
-        }
+    except QueueFullError as e:
+        return queue_full_response(e)
 
-        return jsonify(response_data)
+    except RunNotFoundError as e:
+        return jsonify({"error": str(e)}), 404
 
     except Exception as e:
         return jsonify({"error": str(e)}), 500
 
-    finally:
-        if output_folder and os.path.exists(output_folder):
-            shutil.rmtree(output_folder)
-            
-            
 
 # ==========================================
 # VALIDATE FROM GITHUB JSON FILES
@@ -185,8 +865,6 @@ def validate():
 @app.route("/validate-from-github", methods=["POST"])
 def validate_from_github():
 
-    output_folder = None
-
     try:
         data = request.get_json()
 
@@ -200,108 +878,591 @@ def validate_from_github():
         if not ce_url or not pe_url or not index_url:
             return jsonify({"error": "Missing GitHub raw URLs"}), 400
 
-        # ==========================
-        # FETCH RAW JSON SAFELY
-        # ==========================
+        try:
+            options = parse_run_options(data)
+        except ValueError as e:
+            return jsonify({"error": str(e)}), 400
 
-        ce_data = fetch_github_json(ce_url, "CE")
-        pe_data = fetch_github_json(pe_url, "PE")
-        index_data = fetch_github_json(index_url, "INDEX")
+        if options["profile"] and not admin_request():
+            return jsonify({"error": "profile requires the admin key in X-API-Key"}), 403
 
-        # ==========================
-        # RUN VALIDATION
-        # ==========================
+        if options["stream"]:
+            timer = StageTimer()
+            return stream_response(*fetch_sources(ce_url, pe_url, index_url, timer), options, timer)
 
-        validation_result = run_validation(ce_data, pe_data, index_data)
-        output_folder = validation_result["base_directory"]
+        if options["async_io"]:
 
-        # ==========================
-        # UPLOAD RESULTS TO GITHUB
-        # ==========================
+            if data.get("async"):
+                return submit_job(
+                    fetch_validate_and_upload_async, ce_url, pe_url, index_url, options,
+                    runner=async_runner
+                )
 
-        uploaded_files, timestamp = upload_folder_to_github(
-            folder_path=output_folder,
-            repo=GITHUB_REPO,
-            token=GITHUB_TOKEN
-        )
+            return jsonify(async_runner.run(
+                fetch_validate_and_upload_async(ce_url, pe_url, index_url, options)
+            ))
 
-        # ==========================
-        # BUILD RAW URLS
-        # ==========================
+        if data.get("async"):
+            return submit_job(fetch_validate_and_upload, ce_url, pe_url, index_url, options)
 
-        raw_base = f"https://raw.githubusercontent.com/{GITHUB_REPO}/main/"
-        raw_urls = [raw_base + path for path in uploaded_files]
-        # Find matched signals file
-        matched_signals_url = next(
-            (raw_base + p for p in uploaded_files if "matched_signals.xlsx" in p),
-            None
-        )
+        return jsonify(fetch_validate_and_upload(ce_url, pe_url, index_url, options))
 
-        matched_json_url = next(
-            (raw_base + p for p in uploaded_files if "matched_signals.json" in p),
-            None
-        )
+    except QueueFullError as e:
+        return queue_full_response(e)
 
-        meta_json_url = next(
-            (raw_base + p for p in uploaded_files if "validation_meta.json" in p),
-            None
-        )
-        
+    except RunNotFoundError as e:
+        return jsonify({"error": str(e)}), 404
+
+    except Exception as e:
+        return jsonify({"error": str(e)}), 500
 
-        folder_path = f"validation_results/validation_{timestamp}"
-        folder_url = f"https://github.com/{GITHUB_REPO}/tree/main/{folder_path}"
 
-        response_data = {
-            "status": "success",
-            "repo": GITHUB_REPO,
-            "folder_path": folder_path,
-            "folder_url": folder_url,
-            "matched_signals_url": matched_signals_url,
-            "matched_json_url": matched_json_url,
-            "meta_json_url": meta_json_url,
-            "files": raw_urls
-        }
+# ==========================================
+# BATCH VALIDATION
+# ==========================================
+#
+# Many CE/PE/INDEX triples in one call. Every distinct URL is fetched once
+# (combinations often share an INDEX export), identical triples are
+# validated once, and all new runs are published in a single storage
+# write. A failed fetch or validation only fails its own items.
+
+BATCH_LEGS = ("CE", "PE", "INDEX")
+
+
+def batch_urls(item):
+    return item["ce_url"], item["pe_url"], item["index_url"]
+
+
+def batch_sources(item, fetched):
+
+    sources = []
+
+    for leg, url in zip(BATCH_LEGS, batch_urls(item)):
+        if isinstance(fetched[url], Exception):
+            raise Exception(f"{leg}: {fetched[url]}")
+        sources.append(fetched[url])
+
+    return sources
+
+
+# One batch pool per worker, started on the first batch and kept, so a
+# batch does not pay for starting processes and importing validator.
+batch_pool = None
+batch_pool_lock = threading.Lock()
+
+
+def get_batch_pool():
+
+    global batch_pool
+
+    with batch_pool_lock:
+
+        # forkserver: the request threads are running when the pool
+        # starts, and a forked child can copy a lock one of them holds.
+        if batch_pool is None:
+            batch_pool = ProcessPoolExecutor(
+                max_workers=max(1, BATCH_WORKERS),
+                mp_context=multiprocessing.get_context("forkserver")
+            )
+
+        return batch_pool
+
+
+def drop_batch_pool(pool):
+
+    # A pool process died; the next batch starts a fresh pool.
+    global batch_pool
+
+    with batch_pool_lock:
+        if batch_pool is pool:
+            batch_pool = None
+
+
+def validate_batch_sources(sources, options, timer):
+
+    # sources: {cache key: (ce, pe, index)} -> {cache key: artifacts or
+    # the Exception raised}. Each run is one pool task, so sharding inside
+    # a run is turned off.
+    from validator import build_validation_artifacts
+
+    kwargs = {**validation_options(options), "processes": 0}
+
+    runs = {}
+
+    with timer.stage("validate"):
+
+        pool = get_batch_pool()
+
+        try:
+            futures = {
+                key: pool.submit(timed_call, build_validation_artifacts, StageTimer(), *data, **kwargs)
+                for key, data in sources.items()
+            }
+
+        except BrokenProcessPool:
+            drop_batch_pool(pool)
+            raise
+
+        for key, future in futures.items():
+            try:
+                runs[key], run_timer = future.result()
+                StageTimer().adopt(run_timer)
+            except BrokenProcessPool as e:
+                drop_batch_pool(pool)
+                runs[key] = e
+            except Exception as e:
+                runs[key] = e
+
+    return runs
+
+
+def batch_summary(results, unique_urls, runs_created, timer):
+
+    succeeded = [result for result in results if result["status"] == "success"]
+
+    # Items repeated in a batch share one run; its entries count once.
+    unique_runs = {result["folder_path"]: result for result in succeeded}.values()
+
+    total_ce = sum(result.get("total_ce_entries") or 0 for result in unique_runs)
+    matches = sum(result.get("total_valid_matches") or 0 for result in unique_runs)
+
+    return {
+        "items": len(results),
+        "succeeded": len(succeeded),
+        "failed": len(results) - len(succeeded),
+        "cached": sum(1 for result in succeeded if result.get("cached")),
+        "runs_created": runs_created,
+        "unique_urls": unique_urls,
+        "total_ce_entries": total_ce,
+        "total_valid_matches": matches,
+        "match_percentage": round(matches / total_ce * 100, 2) if total_ce else 0,
+        "timings_seconds": timer.as_dict()["timings_seconds"]
+    }
 
-        return jsonify(response_data)
+
+def run_batch(items, options):
+
+    timer = StageTimer()
+
+    urls = [url for item in items for url in batch_urls(item)]
+
+    with timer.stage("fetch"):
+        fetched = fetch_each_json(urls, max_workers=BATCH_FETCH_WORKERS)
+
+    results = [None] * len(items)
+    pending = {}
+    sources = {}
+
+    for i, item in enumerate(items):
+
+        try:
+            data = batch_sources(item, fetched)
+        except Exception as e:
+            results[i] = {"status": "failed", "error": str(e)}
+            continue
+
+        key = run_cache_key(*data, options)
+        cached = result_cache.get(key) if options["use_cache"] else None
+
+        if cached:
+            results[i] = {**cached, "cached": True}
+        else:
+            pending.setdefault(key, []).append(i)
+            sources[key] = data
+
+    runs = validate_batch_sources(sources, options, timer) if sources else {}
+
+    for key, run in list(runs.items()):
+        if isinstance(run, Exception):
+            for i in pending[key]:
+                results[i] = {"status": "failed", "error": str(run)}
+            del runs[key]
+
+    # ==========================
+    # ONE STORAGE WRITE
+    # ==========================
+
+    if runs:
+        keys = list(runs)
+        prepared = [prepare_upload(runs[key], options, timer) for key in keys]
+
+        with timer.stage("upload"):
+            stored = storage.upload_batch(
+                [artifacts for artifacts, _, _ in prepared],
+                add_runs([meta for _, meta, _ in prepared])
+            )
+
+        refresh_manifest_cache(stored)
+
+        for key, run, (_, _, members) in zip(keys, stored["runs"], prepared):
+            response_data = build_response(run["files"], run["timestamp"], members)
+            result_cache.put(key, response_data)
+
+            for i in pending[key]:
+                results[i] = response_data
+
+    # Per-run stats come from the manifest, for cached items as well.
+    manifest_runs = {run["folder"]: run for run in manifest_cache.get(storage.load_manifest)["runs"]}
+
+    for i, item in enumerate(items):
+
+        result = {"index": i, "name": item.get("name"), **results[i]}
+
+        if result["status"] == "success":
+            run = manifest_runs.get(result["folder_path"].split("/")[-1], {})
+            for field in ("total_ce_entries", "total_valid_matches", "match_percentage"):
+                result[field] = run.get(field)
+
+        results[i] = result
+
+    return {
+        "status": "success",
+        "storage": storage.name,
+        "repo": storage.location,
+        "results": results,
+        "summary": batch_summary(results, len(set(urls)), len(runs), timer)
+    }
+
+
+@app.route("/validate-batch", methods=["POST"])
+def validate_batch():
+
+    try:
+        data = request.get_json()
+
+        if not data:
+            return jsonify({"error": "Invalid JSON body"}), 400
+
+        items = data.get("items")
+
+        if not isinstance(items, list) or not items:
+            return jsonify({"error": "items must be a non-empty list of {ce_url, pe_url, index_url}"}), 400
+
+        if len(items) > BATCH_MAX_ITEMS:
+            return jsonify({"error": f"At most {BATCH_MAX_ITEMS} items per batch"}), 400
+
+        for i, item in enumerate(items):
+            if not isinstance(item, dict) or not all(item.get(key) for key in ("ce_url", "pe_url", "index_url")):
+                return jsonify({"error": f"Missing GitHub raw URLs in item {i}"}), 400
+
+        try:
+            options = parse_run_options(data)
+        except ValueError as e:
+            return jsonify({"error": str(e)}), 400
+
+        if options["append_to"] or options["stream"] or options["profile"]:
+            return jsonify({"error": "append_to, stream and profile are not supported for batches"}), 400
+
+        if data.get("async"):
+            return submit_job(run_batch, items, options)
+
+        return jsonify(run_batch(items, options))
 
     except Exception as e:
         return jsonify({"error": str(e)}), 500
 
-    finally:
-        if output_folder and os.path.exists(output_folder):
-            shutil.rmtree(output_folder)
-            
+
+# ==========================================
+# VALIDATION JOB STATUS
+# ==========================================
+
+@app.route("/jobs/<job_id>", methods=["GET"])
+def job_status(job_id):
+
+    job = job_queue.get(job_id)
+
+    if not job:
+        return jsonify({"error": "Unknown job id"}), 404
+
+    return jsonify({
+        "job_id": job_id,
+        "status": job["status"],
+        "queue_position": job_queue.position(job_id),
+        "created_at": job["created_at"],
+        "started_at": job["started_at"],
+        "finished_at": job["finished_at"],
+        "error": job["error"],
+        "result_url": f"/jobs/{job_id}/result"
+    })
+
+
+@app.route("/jobs/<job_id>/result", methods=["GET"])
+def job_result(job_id):
+
+    job = job_queue.get(job_id)
+
+    if not job:
+        return jsonify({"error": "Unknown job id"}), 404
+
+    if job["status"] == "failed":
+        return jsonify({"error": job["error"]}), 500
+
+    if job["status"] != "succeeded":
+        return jsonify({"job_id": job_id, "status": job["status"]}), 202
+
+    return jsonify(job["result"])
+
+
+# ==========================================
+# RUN FILES AND ARCHIVES
+# ==========================================
+#
+#   GET /runs/<folder>/archive          the run's run.zip
+#   GET /runs/<folder>/archive/index    its members (name, size, compressed
+#                                       size, offset, crc32, compression)
+#   GET /runs/<folder>/files/<member>   one artifact, out of the archive or
+#                                       stored loose
+#
+# All three honour a single "Range: bytes=..." header; for members the
+# range is over the uncompressed bytes. Storage is read in byte ranges:
+# only the zip directory and the requested member are fetched, and a
+# deflated member is inflated as it streams.
+
+
+def open_run_file(folder, path):
+
+    if not RUN_FOLDER.fullmatch(folder) or ".." in path.split("/"):
+        return None
+
+    return storage.open_reader(f"{BASE_PATH}/{folder}/{path}")
+
+
+def ranged_response(reader, size, chunks, mimetype):
+
+    # chunks(start, end) yields the bytes and closes reader when done.
+    try:
+        byte_range = parse_range(request.headers.get("Range"), size)
+
+    except ValueError:
+        reader.close()
+        return Response(status=416, headers={"Content-Range": f"bytes */{size}"})
+
+    start, end = byte_range or (0, size)
+
+    response = Response(chunks(start, end), status=206 if byte_range else 200, mimetype=mimetype)
+    response.headers["Accept-Ranges"] = "bytes"
+    response.headers["Content-Length"] = str(end - start)
+
+    if byte_range:
+        response.headers["Content-Range"] = f"bytes {start}-{end - 1}/{size}"
+
+    return response
+
+
+def stored_range_response(reader, mimetype):
+
+    def chunks(start, end):
+        with reader:
+            yield from iter_range(reader, start, end)
+
+    return ranged_response(reader, reader.size, chunks, mimetype)
+
+
+@app.route("/runs/<folder>/archive", methods=["GET"])
+def run_archive_file(folder):
+
+    try:
+        reader = open_run_file(folder, ARCHIVE_NAME)
+
+        if reader is None:
+            return jsonify({"error": f"No archive for {folder}"}), 404
+
+        return stored_range_response(reader, "application/zip")
+
+    except Exception as e:
+        return jsonify({"error": str(e)}), 500
+
+
+@app.route("/runs/<folder>/archive/index", methods=["GET"])
+def run_archive_index(folder):
+
+    try:
+        reader = open_run_file(folder, ARCHIVE_NAME)
+
+        if reader is None:
+            return jsonify({"error": f"No archive for {folder}"}), 404
+
+        with reader, open_archive(reader) as archive:
+            return jsonify({
+                "folder": folder,
+                "archive_size": reader.size,
+                "members": archive_index(archive)
+            })
+
+    except Exception as e:
+        return jsonify({"error": str(e)}), 500
+
+
+@app.route("/runs/<folder>/files/<path:member>", methods=["GET"])
+def run_file(folder, member):
+
+    try:
+        mimetype = mimetypes.guess_type(member)[0] or "application/octet-stream"
+
+        reader = open_run_file(folder, ARCHIVE_NAME)
+
+        if reader is None:
+            # Not an archived run: the file as stored.
+            reader = open_run_file(folder, member)
+
+            if reader is None:
+                return jsonify({"error": f"No {member} in {folder}"}), 404
+
+            return stored_range_response(reader, mimetype)
+
+        try:
+            archive = open_archive(reader)
+        except Exception:
+            reader.close()
+            raise
+
+        size = member_size(archive, member)
+
+        if size is None:
+            # Files added after packing (a profile) sit next to the archive.
+            reader.close()
+            reader = open_run_file(folder, member)
+
+            if reader is None:
+                return jsonify({"error": f"No {member} in {folder}"}), 404
+
+            return stored_range_response(reader, mimetype)
+
+        def chunks(start, end):
+            with reader, archive:
+                yield from iter_member(archive, member, start, end)
+
+        return ranged_response(reader, size, chunks, mimetype)
+
+    except Exception as e:
+        return jsonify({"error": str(e)}), 500
+
+
+# ==========================================
+# PROMETHEUS METRICS
+# ==========================================
+
+CACHE_GAUGE = register(Gauge(
+    "result_cache",
+    "Result cache entries and counters",
+    labels=("field",)
+))
+
+JOBS_GAUGE = register(Gauge(
+    "validation_jobs_active",
+    "Validation jobs queued or running"
+))
+
+
+@app.route("/metrics", methods=["GET"])
+def metrics():
+
+    for field, value in result_cache.stats().items():
+        CACHE_GAUGE.set(value, field=field)
+
+    JOBS_GAUGE.set(job_queue.active_count())
+
+    return Response(render_metrics(), mimetype="text/plain; version=0.0.4")
+
+
+# ==========================================
+# RESULT CACHE STATS
+# ==========================================
+
+@app.route("/cache-stats", methods=["GET"])
+def cache_stats():
+    return jsonify(result_cache.stats())
+
+
 # ==========================================
 # LIST ALL VALIDATION FOLDERS
 # ==========================================
 
+def matched_excel_url(run):
+
+    # None when the run has no Excel export. Runs listed from their folders
+    # alone have no formats and were written with the defaults.
+    if "excel" not in (run.get("formats") or DEFAULT_FORMATS):
+        return None
+
+    if run.get("archive"):
+        return f"/runs/{run['folder']}/files/{MATCHED_EXCEL}"
+
+    return storage.file_url(f"{BASE_PATH}/{run['folder']}/{MATCHED_EXCEL}")
+
+
 @app.route("/list-validations", methods=["GET"])
 def list_validations():
 
     try:
-        base_path = "validation_results"
-
-        contents = get_folder_contents(
-            repo=GITHUB_REPO,
-            token=GITHUB_TOKEN,
-            path=base_path
+        page = max(request.args.get("page", 1, type=int), 1)
+        per_page = request.args.get("per_page", LIST_PAGE_SIZE, type=int)
+        per_page = min(max(per_page, 1), LIST_MAX_PAGE_SIZE)
+
+        manifest = manifest_cache.get(storage.load_manifest)
+
+        runs = filter_runs(
+            manifest["runs"],
+            query=request.args.get("q"),
+            symbol=request.args.get("symbol"),
+            date_from=request.args.get("from"),
+            date_to=request.args.get("to")
         )
 
-        folders = [
-            item["name"]
-            for item in contents
-            if item["type"] == "dir"
+        start = (page - 1) * per_page
+
+        page_runs = [
+            {
+                **run,
+                "folder_url": storage.folder_url(f"{BASE_PATH}/{run['folder']}"),
+                "matched_excel_url": matched_excel_url(run)
+            }
+            for run in runs[start:start + per_page]
         ]
 
         return jsonify({
             "status": "success",
-            "repo": GITHUB_REPO,
-            "folders": folders
+            "storage": storage.name,
+            "repo": storage.location,
+            "folders": [run["folder"] for run in page_runs],
+            "runs": page_runs,
+            "total": len(runs),
+            "page": page,
+            "per_page": per_page,
+            "pages": max(1, -(-len(runs) // per_page))
         })
 
     except Exception as e:
         return jsonify({"error": str(e)}), 500
-                
+
+
+# ==========================================
+# CROSS-RUN STATISTICS
+# ==========================================
+
+@app.route("/validation-stats", methods=["GET"])
+def validation_stats():
+
+    try:
+        manifest = manifest_cache.get(storage.load_manifest)
+
+        stats = dict(manifest["stats"])
+
+        last = request.args.get("last", type=int)
+        if last:
+            stats["trend"] = stats["trend"][-last:]
+
+        return jsonify({
+            "status": "success",
+            "storage": storage.name,
+            "repo": storage.location,
+            **stats
+        })
+
+    except Exception as e:
+        return jsonify({"error": str(e)}), 500
+
+
 # ==========================================
 # RUN LOCAL SERVER
 # ==========================================
@@ -0,0 +1,115 @@
+import asyncio
+import threading
+import functools
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+
+from job_queue import QueueFullError
+from metrics import Gauge, register
+
+# ==========================================
+# EVENT LOOP RUNNER FOR THE ASYNC I/O PATH
+# ==========================================
+#
+# One event loop per process, in a background thread. Validations submitted
+# here await their fetches and uploads on the loop, so a single worker keeps
+# many of them in flight while the sockets wait; the CPU-bound validation
+# itself goes to a process pool (run_cpu) so it never blocks the loop.
+
+ASYNC_IN_FLIGHT = register(Gauge(
+    "validation_async_in_flight",
+    "Validations in flight on the async I/O path"
+))
+
+
+def timed_call(fn, timer, *args, **kwargs):
+
+    # Runs in a pool process: stages are timed on a copy of the caller's
+    # timer, which is sent back with the result (see StageTimer.adopt).
+    return fn(*args, timer=timer, **kwargs), timer
+
+
+class AsyncRunner:
+
+    def __init__(self, cpu_workers=1, max_in_flight=32):
+
+        self.cpu_workers = cpu_workers
+        self.max_in_flight = max_in_flight
+
+        self.loop = None
+        self.executor = None
+        self.in_flight = 0
+        self.lock = threading.Lock()
+
+    def start(self):
+
+        # Started on first use rather than at import, so gunicorn workers
+        # forked from a preloaded app each get their own loop thread.
+        with self.lock:
+
+            if self.loop is None:
+                self.executor = self.create_executor()
+                self.loop = asyncio.new_event_loop()
+
+                threading.Thread(
+                    target=self.loop.run_forever,
+                    name="validation-async-io",
+                    daemon=True
+                ).start()
+
+        return self.loop
+
+    def create_executor(self):
+
+        # The loop thread is already running when pool workers start, and
+        # forking a threaded process can copy locks held by other threads.
+        return ProcessPoolExecutor(
+            max_workers=self.cpu_workers,
+            mp_context=multiprocessing.get_context("forkserver")
+        )
+
+    def submit(self, coro):
+
+        # -> concurrent.futures.Future of the coroutine's result.
+        loop = self.start()
+
+        with self.lock:
+
+            if self.in_flight >= self.max_in_flight:
+                coro.close()
+                raise QueueFullError("Async validation capacity is full, retry later")
+
+            self.in_flight += 1
+            ASYNC_IN_FLIGHT.set(self.in_flight)
+
+        future = asyncio.run_coroutine_threadsafe(coro, loop)
+        future.add_done_callback(self.finished)
+
+        return future
+
+    def finished(self, future):
+        with self.lock:
+            self.in_flight -= 1
+            ASYNC_IN_FLIGHT.set(self.in_flight)
+
+    def run(self, coro):
+        # Blocks the calling thread only; the loop keeps serving the rest.
+        return self.submit(coro).result()
+
+    async def run_cpu(self, fn, *args, **kwargs):
+
+        executor = self.executor
+
+        try:
+            return await asyncio.get_running_loop().run_in_executor(
+                executor, functools.partial(fn, *args, **kwargs)
+            )
+
+        except BrokenProcessPool:
+            # A pool process died (e.g. out of memory); later runs get a
+            # fresh pool instead of failing forever.
+            with self.lock:
+                if self.executor is executor:
+                    self.executor = self.create_executor()
+            raise
@@ -0,0 +1,182 @@
+import os
+import sys
+import json
+import time
+import argparse
+import tempfile
+import statistics
+import subprocess
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# ==========================================
+# STARTUP / FIRST-REQUEST BENCHMARK
+# ==========================================
+#
+#   python benchmarks/bench_startup.py                     # compare to baselines
+#   python benchmarks/bench_startup.py --preload           # data stack loaded first
+#   python benchmarks/bench_startup.py --update-baselines
+#
+# Every trial is a fresh interpreter: import app, then the first /health
+# and the first and second /validate (local storage in a temp directory,
+# no network). Medians are compared to the stored baselines; the run also
+# fails if importing app loads any of HEAVY_MODULES. Exits with status 1
+# on a regression.
+
+BASELINE_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "startup_baselines.json")
+DEFAULT_TOLERANCE = 0.5
+
+# Added to every limit so millisecond-sized timings (/health) do not flap.
+DEFAULT_SLACK_SECONDS = 0.05
+DEFAULT_TRIALS = 5
+DEFAULT_ROWS = 1000
+
+HEAVY_MODULES = ("pandas", "numpy", "openpyxl", "pyarrow", "aiohttp")
+
+
+def child(rows, preload):
+
+    # One measurement, printed as JSON for the parent.
+    sys.path.insert(0, ROOT)
+
+    if preload:
+        # What a worker forked from a preloaded gunicorn master starts with.
+        import validator  # noqa: F401
+
+    start = time.perf_counter()
+    import app
+    import_seconds = time.perf_counter() - start
+
+    heavy = [name for name in HEAVY_MODULES if name in sys.modules and not preload]
+
+    client = app.app.test_client()
+
+    def timed_request(method, path, **kwargs):
+        start = time.perf_counter()
+        response = client.open(path, method=method, **kwargs)
+        if response.status_code != 200:
+            raise SystemExit(f"{path} returned {response.status_code}: {response.get_data(as_text=True)}")
+        return time.perf_counter() - start
+
+    # Generated only now: the generator itself imports pandas.
+    from utils.synthetic_trades import generate_trades
+
+    health_first_seconds = timed_request("GET", "/health")
+
+    ce, pe, index = generate_trades(rows, seed=1)
+
+    body = {"ce_data": ce, "pe_data": pe, "index_data": index, "formats": ["json"], "no_cache": True}
+
+    result = {
+        "import_seconds": import_seconds,
+        "health_first_seconds": health_first_seconds,
+        "validate_first_seconds": timed_request("POST", "/validate", json=body),
+        "validate_second_seconds": timed_request("POST", "/validate", json=body),
+        "heavy_modules_at_import": heavy
+    }
+
+    print(json.dumps(result))
+
+
+def run_trial(rows, preload):
+
+    with tempfile.TemporaryDirectory() as storage_dir:
+
+        env = {
+            **os.environ,
+            "STORAGE_BACKEND": "local",
+            "LOCAL_STORAGE_DIR": storage_dir,
+            "FETCH_CACHE_DIR": os.path.join(storage_dir, "fetch_cache")
+        }
+
+        command = [sys.executable, os.path.abspath(__file__), "--child", "--rows", str(rows)]
+        if preload:
+            command.append("--preload")
+
+        output = subprocess.run(command, env=env, cwd=storage_dir, check=True,
+                                capture_output=True, text=True).stdout
+
+    return json.loads(output.strip().splitlines()[-1])
+
+
+def summarize(trials):
+
+    result = {
+        metric: round(statistics.median(trial[metric] for trial in trials), 4)
+        for metric in trials[0] if metric.endswith("_seconds")
+    }
+
+    result["heavy_modules_at_import"] = sorted({name for trial in trials for name in trial["heavy_modules_at_import"]})
+
+    return result
+
+
+def compare(mode, result, baseline, tolerance, slack):
+
+    failures = []
+
+    if result["heavy_modules_at_import"]:
+        failures.append(f"{mode}: importing app loads {', '.join(result['heavy_modules_at_import'])}")
+
+    for metric, value in result.items():
+
+        if not metric.endswith("_seconds") or metric not in baseline:
+            continue
+
+        limit = baseline[metric] * (1 + tolerance) + slack
+
+        if value > limit:
+            failures.append(
+                f"{mode}: {metric} {value} exceeds baseline {baseline[metric]} (+{int(tolerance * 100)}%)"
+            )
+
+    return failures
+
+
+def main():
+
+    parser = argparse.ArgumentParser(description="Benchmark app startup and first-request latency")
+    parser.add_argument("--trials", type=int, default=DEFAULT_TRIALS)
+    parser.add_argument("--rows", type=int, default=DEFAULT_ROWS,
+                        help="trades per leg in the /validate requests")
+    parser.add_argument("--preload", action="store_true",
+                        help="import the data stack before the app, as a preloaded gunicorn worker would")
+    parser.add_argument("--tolerance", type=float, default=DEFAULT_TOLERANCE)
+    parser.add_argument("--slack", type=float, default=DEFAULT_SLACK_SECONDS)
+    parser.add_argument("--baselines", default=BASELINE_PATH)
+    parser.add_argument("--update-baselines", action="store_true")
+    parser.add_argument("--child", action="store_true", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.child:
+        child(args.rows, args.preload)
+        return 0
+
+    mode = "preload" if args.preload else "lazy"
+
+    result = summarize([run_trial(args.rows, args.preload) for _ in range(args.trials)])
+
+    print(f"{mode:>8}  " + "  ".join(f"{k}={v}" for k, v in result.items()))
+
+    baselines = {}
+    if os.path.exists(args.baselines):
+        with open(args.baselines) as f:
+            baselines = json.load(f)
+
+    if args.update_baselines:
+        baselines[mode] = {k: v for k, v in result.items() if k.endswith("_seconds")}
+        with open(args.baselines, "w") as f:
+            json.dump(baselines, f, indent=4)
+        print(f"Baselines written to {args.baselines}")
+        return 0
+
+    failures = compare(mode, result, baselines.get(mode, {}), args.tolerance, args.slack)
+
+    for failure in failures:
+        print("REGRESSION:", failure)
+
+    return 1 if failures else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
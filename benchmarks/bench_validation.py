@@ -0,0 +1,189 @@
+import os
+import sys
+import json
+import time
+import argparse
+import tracemalloc
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import pandas as pd
+
+from validator import prepare_trades, match_signals, match_signals_sharded, excel_bytes
+from utils.synthetic_trades import generate_trades
+
+# ==========================================
+# RUN_VALIDATION BENCHMARK SUITE
+# ==========================================
+#
+#   python benchmarks/bench_validation.py                  # compare to baselines
+#   python benchmarks/bench_validation.py --sizes 1000,10000
+#   python benchmarks/bench_validation.py --update-baselines
+#
+# Exits with status 1 when a stage is slower (or uses more memory) than
+# its stored baseline by more than the allowed tolerance.
+
+DEFAULT_SIZES = (1000, 10000, 100000, 1000000)
+BASELINE_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "baselines.json")
+DEFAULT_TOLERANCE = 0.5
+DEFAULT_MEMORY_MAX_ROWS = 100000
+
+
+def stage_parse(ce, pe, index):
+    return (
+        prepare_trades(pd.DataFrame(ce)),
+        prepare_trades(pd.DataFrame(pe)),
+        prepare_trades(pd.DataFrame(index))
+    )
+
+
+def stage_match(frames, processes=0):
+    if processes > 1:
+        return match_signals_sharded(*frames, processes=processes)
+    return match_signals(*frames)
+
+
+def stage_export(match_result):
+    matched_df, ce_unmatched, _ = match_result
+    excel_bytes(matched_df)
+    excel_bytes(ce_unmatched)
+    matched_df.to_json(orient="records", indent=4)
+
+
+def timed(fn, *args):
+    start = time.perf_counter()
+    result = fn(*args)
+    return result, time.perf_counter() - start
+
+
+def peak_mb(fn, *args):
+    # tracemalloc slows pandas/openpyxl down several times, so memory is
+    # measured in its own pass and never mixed into the timings.
+    tracemalloc.start()
+    try:
+        result = fn(*args)
+        return result, tracemalloc.get_traced_memory()[1] / (1024 * 1024)
+    finally:
+        tracemalloc.stop()
+
+
+def bench_size(n, match_rate, cluster_size, memory, processes=0):
+
+    ce, pe, index = generate_trades(n, match_rate=match_rate, cluster_size=cluster_size)
+
+    frames, parse_s = timed(stage_parse, ce, pe, index)
+    match_result, match_s = timed(stage_match, frames, processes)
+    _, export_s = timed(stage_export, match_result)
+
+    result = {
+        "parse_seconds": round(parse_s, 4),
+        "match_seconds": round(match_s, 4),
+        "export_seconds": round(export_s, 4),
+        "matched_rows": len(match_result[0])
+    }
+
+    # Sharded matching must find exactly what serial matching finds.
+    if processes > 1:
+        result["serial_matched_rows"] = len(match_signals(*frames)[0])
+
+    if memory:
+        frames, parse_peak = peak_mb(stage_parse, ce, pe, index)
+        match_result, match_peak = peak_mb(stage_match, frames, processes)
+        _, export_peak = peak_mb(stage_export, match_result)
+
+        result.update({
+            "parse_peak_mb": round(parse_peak, 2),
+            "match_peak_mb": round(match_peak, 2),
+            "export_peak_mb": round(export_peak, 2)
+        })
+
+    return result
+
+
+def compare(size, result, baseline, tolerance):
+
+    failures = []
+
+    # Match counts are exact: every mode run here, and the baseline, must
+    # agree. A faster run that finds different matches is a regression.
+    counts = {
+        mode: value for mode, value in (
+            ("matched_rows", result["matched_rows"]),
+            ("serial_matched_rows", result.get("serial_matched_rows")),
+            ("baseline matched_rows", baseline.get("matched_rows"))
+        )
+        if value is not None
+    }
+
+    if len(set(counts.values())) > 1:
+        failures.append(f"{size} rows: match counts differ: " + ", ".join(f"{k}={v}" for k, v in counts.items()))
+
+    for metric, value in result.items():
+
+        if not metric.endswith(("_seconds", "_mb")) or metric not in baseline:
+            continue
+
+        limit = baseline[metric] * (1 + tolerance)
+
+        if value > limit:
+            failures.append(
+                f"{size} rows: {metric} {value} exceeds baseline {baseline[metric]} (+{int(tolerance * 100)}%)"
+            )
+
+    return failures
+
+
+def main():
+
+    parser = argparse.ArgumentParser(description="Benchmark parsing, matching and export")
+    parser.add_argument("--sizes", default=",".join(str(s) for s in DEFAULT_SIZES))
+    parser.add_argument("--match-rate", type=float, default=0.6)
+    parser.add_argument("--cluster-size", type=int, default=1)
+    parser.add_argument("--processes", type=int, default=0,
+                        help="benchmark sharded matching with this many processes")
+    parser.add_argument("--tolerance", type=float, default=DEFAULT_TOLERANCE)
+    parser.add_argument("--memory-max-rows", type=int, default=DEFAULT_MEMORY_MAX_ROWS,
+                        help="profile memory only up to this many rows (0 disables)")
+    parser.add_argument("--baselines", default=BASELINE_PATH)
+    parser.add_argument("--update-baselines", action="store_true")
+    args = parser.parse_args()
+
+    sizes = [int(s) for s in args.sizes.split(",") if s]
+
+    baselines = {}
+    if os.path.exists(args.baselines):
+        with open(args.baselines) as f:
+            baselines = json.load(f)
+
+    results = {}
+    failures = []
+
+    for n in sizes:
+
+        result = bench_size(n, args.match_rate, args.cluster_size, memory=n <= args.memory_max_rows,
+                             processes=args.processes)
+        results[str(n)] = result
+
+        print(f"{n:>8} rows  " + "  ".join(f"{k}={v}" for k, v in result.items()))
+
+        if not args.update_baselines:
+            failures.extend(compare(n, result, baselines.get(str(n), {}), args.tolerance))
+
+    if args.update_baselines:
+        baselines.update({
+            size: {k: v for k, v in result.items() if k != "serial_matched_rows"}
+            for size, result in results.items()
+        })
+        with open(args.baselines, "w") as f:
+            json.dump(baselines, f, indent=4)
+        print(f"Baselines written to {args.baselines}")
+        return 0
+
+    for failure in failures:
+        print("REGRESSION:", failure)
+
+    return 1 if failures else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,229 @@
+import numpy as np
+import pandas as pd
+
+
+TIME_FORMAT = "%d-%m-%Y %H:%M:%S"
+
+# ==========================================
+# LEG CONFIGURATION
+# ==========================================
+#
+# A configuration names one anchor leg and any number of confirming legs.
+# Each confirming leg maps the anchor's signal to the signal it must show
+# and has its own tolerance window around the anchor entry time:
+#
+#   {
+#       "anchor": "CE",
+#       "legs": [
+#           {"name": "PE", "tolerance": "1min", "signals": {"BUY": "SELL", "SELL": "BUY"}},
+#           ...
+#       ],
+#       "confirmation_types": {"BUY": "CE Bullish Confirmed", ...}
+#   }
+#
+# Anchor rows whose signal is not in confirmation_types are ignored.
+
+THREE_LEG_CONFIG = {
+    "anchor": "CE",
+    "legs": [
+        {"name": "PE", "tolerance": "1min", "signals": {"BUY": "SELL", "SELL": "BUY"}},
+        {"name": "INDEX", "tolerance": "1min", "signals": {"BUY": "BUY", "SELL": "SELL"}}
+    ],
+    "confirmation_types": {
+        "BUY": "CE Bullish Confirmed",
+        "SELL": "CE Bearish Confirmed"
+    }
+}
+
+
+def max_tolerance(config):
+    return max(pd.Timedelta(leg["tolerance"]) for leg in config["legs"])
+
+
+def column_values(df, name):
+    if name in df.columns:
+        return df[name].to_numpy()
+    return np.full(len(df), None, dtype=object)
+
+
+def as_ns(times):
+    return np.asarray(times).astype("datetime64[ns]").astype(np.int64)
+
+
+# ==========================================
+# SWEEP LINE
+# ==========================================
+
+def sweep_first_at_or_after(stream, bounds):
+
+    # For sorted bounds, the position of the first stream event >= each
+    # bound. Both inputs are already sorted, so the stable sort below is a
+    # single merge of two runs (linear), and walking the merged sequence
+    # counts how many stream events precede each bound. Bounds go first so
+    # an event equal to a bound sorts after it.
+    merged = np.concatenate((bounds, stream))
+    order = np.argsort(merged, kind="stable")
+
+    is_event = order >= len(bounds)
+    events_before = np.cumsum(is_event) - is_event
+
+    positions = np.empty(len(bounds), dtype=np.int64)
+    positions[order[~is_event]] = events_before[~is_event]
+
+    return positions
+
+
+def first_confirmation(anchor_times, stream_times, tolerance):
+
+    # First stream event inside [t - tolerance, t + tolerance] for every
+    # anchor time, or -1. The event order is the stream's sorted order, so
+    # ties keep the same first candidate a row-by-row scan would pick.
+    tol = pd.Timedelta(tolerance).value
+
+    positions = sweep_first_at_or_after(stream_times, anchor_times - tol)
+
+    found = positions < len(stream_times)
+    found[found] = stream_times[positions[found]] <= anchor_times[found] + tol
+
+    return np.where(found, positions, -1)
+
+
+def confirm_legs(frames, config=THREE_LEG_CONFIG):
+
+    # frames: {leg name: DataFrame sorted by entry_time with entry_signal}.
+    # Returns, per anchor row, whether it was considered and the position
+    # of its first confirming row in every leg (-1 when there is none).
+    anchor = frames[config["anchor"]]
+    anchor_times = as_ns(anchor['entry_time'].to_numpy())
+    anchor_signals = anchor['entry_signal'].to_numpy()
+
+    considered = np.zeros(len(anchor), dtype=bool)
+    confirmation = np.full(len(anchor), None, dtype=object)
+
+    positions = {
+        leg["name"]: np.full(len(anchor), -1, dtype=np.int64)
+        for leg in config["legs"]
+    }
+    required = {
+        leg["name"]: np.full(len(anchor), None, dtype=object)
+        for leg in config["legs"]
+    }
+
+    # One event stream per (leg, signal), each already in time order.
+    streams = {}
+    for leg in config["legs"]:
+        df = frames[leg["name"]]
+        leg_times = as_ns(df['entry_time'].to_numpy())
+        leg_signals = df['entry_signal'].to_numpy()
+
+        for signal in set(leg["signals"].values()):
+            rows = np.flatnonzero(leg_signals == signal)
+            streams[(leg["name"], signal)] = (rows, leg_times[rows])
+
+    for anchor_signal, confirmation_type in config["confirmation_types"].items():
+
+        anchor_rows = np.flatnonzero(anchor_signals == anchor_signal)
+        if len(anchor_rows) == 0:
+            continue
+
+        considered[anchor_rows] = True
+        confirmation[anchor_rows] = confirmation_type
+
+        for leg in config["legs"]:
+
+            signal = leg["signals"].get(anchor_signal)
+            required[leg["name"]][anchor_rows] = signal
+
+            if signal is None:
+                continue
+
+            rows, times = streams[(leg["name"], signal)]
+            hit = first_confirmation(anchor_times[anchor_rows], times, leg["tolerance"])
+
+            positions[leg["name"]][anchor_rows[hit >= 0]] = rows[hit[hit >= 0]]
+
+    confirmed = considered.copy()
+    for leg_positions in positions.values():
+        confirmed &= leg_positions >= 0
+
+    return {
+        "considered": considered,
+        "confirmed": confirmed,
+        "positions": positions,
+        "required": required,
+        "confirmation": confirmation
+    }
+
+
+# ==========================================
+# OUTPUT TABLES
+# ==========================================
+
+def leg_columns(name, df, rows, signals):
+    return {
+        f"{name} Symbol": column_values(df, 'symbol')[rows],
+        f"{name} TradeNo": column_values(df, 'tradeNo')[rows],
+        f"{name} Signal": signals,
+        f"{name} Time": df['entry_time'].iloc[rows].dt.strftime(TIME_FORMAT).to_numpy()
+    }
+
+
+def match_legs(frames, config=THREE_LEG_CONFIG):
+
+    # Returns (matched_df, anchor_unmatched_df, {leg name: used index labels}).
+    anchor_name = config["anchor"]
+    anchor = frames[anchor_name]
+    anchor_signals = anchor['entry_signal'].to_numpy()
+
+    result = confirm_legs(frames, config)
+
+    # =============================
+    # MATCHED
+    # =============================
+
+    m_anchor = np.flatnonzero(result["confirmed"])
+
+    if len(m_anchor):
+        columns = leg_columns(anchor_name, anchor, m_anchor, anchor_signals[m_anchor])
+
+        for leg in config["legs"]:
+            name = leg["name"]
+            columns.update(leg_columns(
+                name,
+                frames[name],
+                result["positions"][name][m_anchor],
+                result["required"][name][m_anchor]
+            ))
+
+        columns["Confirmation Type"] = result["confirmation"][m_anchor]
+        columns["Status"] = "VALID"
+
+        matched_df = pd.DataFrame(columns)
+    else:
+        matched_df = pd.DataFrame()
+
+    # =============================
+    # ANCHOR UNMATCHED
+    # =============================
+
+    u_anchor = np.flatnonzero(result["considered"] & ~result["confirmed"])
+
+    if len(u_anchor):
+        missing = " or ".join(leg["name"] for leg in config["legs"])
+
+        unmatched_df = pd.DataFrame({
+            f"{anchor_name} Symbol": column_values(anchor, 'symbol')[u_anchor],
+            f"{anchor_name} TradeNo": column_values(anchor, 'tradeNo')[u_anchor],
+            "Signal": anchor_signals[u_anchor],
+            "Time": anchor['entry_time'].iloc[u_anchor].dt.strftime(TIME_FORMAT).to_numpy(),
+            "Reason": f"{missing} confirmation missing"
+        })
+    else:
+        unmatched_df = pd.DataFrame()
+
+    used = {
+        leg["name"]: set(frames[leg["name"]].index[np.unique(result["positions"][leg["name"]][m_anchor])])
+        for leg in config["legs"]
+    }
+
+    return matched_df, unmatched_df, used
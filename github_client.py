@@ -0,0 +1,291 @@
+import os
+import time
+import json
+import asyncio
+import threading
+import requests
+
+from utils.fetch_json import create_session, load_aiohttp
+from metrics import (
+    GITHUB_REQUESTS,
+    GITHUB_SECONDS,
+    GITHUB_RETRIES,
+    GITHUB_BACKOFF_SECONDS,
+    GITHUB_RATE_REMAINING
+)
+
+# ==========================================
+# SHARED GITHUB API CLIENT
+# ==========================================
+#
+# Every GitHub API call in the app goes through github_request: one pooled
+# session, at most GITHUB_MAX_CONCURRENCY calls in flight per process, and
+# retries that honour GitHub's rate limits. On 403/429 the wait comes from
+# Retry-After, else X-RateLimit-Reset when X-RateLimit-Remaining is 0, else
+# exponential backoff (secondary limits may send neither). Once a response
+# reports the quota as used up, later calls wait for the reset instead of
+# spending requests on errors. 502/503/504 and connection errors are
+# retried with the same exponential backoff.
+
+GITHUB_API = "https://api.github.com"
+GITHUB_TIMEOUT = 30
+GITHUB_MAX_CONCURRENCY = int(os.getenv("GITHUB_MAX_CONCURRENCY", "8"))
+GITHUB_MAX_RETRIES = int(os.getenv("GITHUB_MAX_RETRIES", "5"))
+
+# Longest single wait; a limit that resets later than this is returned to
+# the caller as an error instead of blocking a worker.
+GITHUB_MAX_BACKOFF = int(os.getenv("GITHUB_MAX_BACKOFF", "60"))
+BACKOFF_BASE = 1.0
+
+RETRY_STATUSES = (502, 503, 504)
+
+SESSION = create_session(GITHUB_MAX_CONCURRENCY)
+
+# Shared by the blocking and the async calls, so together they stay within
+# GITHUB_MAX_CONCURRENCY.
+LIMITER = threading.BoundedSemaphore(GITHUB_MAX_CONCURRENCY)
+LIMITER_POLL_SECONDS = 0.01
+
+rate_limit_lock = threading.Lock()
+rate_limited_until = 0.0
+
+
+def github_headers(token):
+    return {
+        "Authorization": f"Bearer {token}",
+        "Accept": "application/vnd.github+json"
+    }
+
+
+def api_endpoint(url):
+
+    # "https://api.github.com/repos/o/r/git/blobs/..." -> "git/blobs"
+    if not url.startswith(GITHUB_API):
+        return "raw"
+
+    parts = url.split("/repos/", 1)[-1].split("/")[2:]
+
+    if parts[:1] == ["git"]:
+        return "/".join(parts[:2])
+
+    return parts[0] if parts else "repo"
+
+
+def is_rate_limited(response):
+
+    if response.status_code == 429:
+        return True
+
+    # 403 is also used for plain permission errors; only the ones that say
+    # so are rate limits.
+    return response.status_code == 403 and (
+        "Retry-After" in response.headers
+        or response.headers.get("X-RateLimit-Remaining") == "0"
+        or "rate limit" in response.text.lower()
+    )
+
+
+def rate_limit_wait(response, attempt):
+
+    retry_after = response.headers.get("Retry-After")
+    if retry_after and retry_after.isdigit():
+        return float(retry_after)
+
+    reset = response.headers.get("X-RateLimit-Reset")
+    if response.headers.get("X-RateLimit-Remaining") == "0" and reset and reset.isdigit():
+        return max(float(reset) - time.time(), 0.0) + 1
+
+    return BACKOFF_BASE * 2 ** attempt
+
+
+def note_rate_limit(response):
+
+    # Remember an exhausted quota so other threads wait for its reset.
+    global rate_limited_until
+
+    remaining = response.headers.get("X-RateLimit-Remaining")
+    if remaining is None or not remaining.isdigit():
+        return
+
+    GITHUB_RATE_REMAINING.set(int(remaining))
+
+    reset = response.headers.get("X-RateLimit-Reset")
+    if remaining == "0" and reset and reset.isdigit():
+        with rate_limit_lock:
+            rate_limited_until = max(rate_limited_until, float(reset) + 1)
+
+
+def quota_wait():
+
+    wait = rate_limited_until - time.time()
+
+    if 0 < wait <= GITHUB_MAX_BACKOFF:
+        GITHUB_BACKOFF_SECONDS.inc(wait, reason="quota")
+        return wait
+
+    return 0
+
+
+def wait_for_quota():
+
+    wait = quota_wait()
+
+    if wait:
+        time.sleep(wait)
+
+
+def send(method, url, endpoint, **kwargs):
+
+    # One attempt, inside the concurrency limit, timed per call.
+    with LIMITER:
+        start = time.perf_counter()
+
+        try:
+            response = SESSION.request(method, url, **kwargs)
+        finally:
+            GITHUB_SECONDS.observe(time.perf_counter() - start, method=method, endpoint=endpoint)
+
+    GITHUB_REQUESTS.inc(method=method, endpoint=endpoint, status=response.status_code)
+    note_rate_limit(response)
+
+    return response
+
+
+def github_request(method, url, **kwargs):
+
+    endpoint = api_endpoint(url)
+    kwargs.setdefault("timeout", GITHUB_TIMEOUT)
+
+    for attempt in range(GITHUB_MAX_RETRIES + 1):
+
+        wait_for_quota()
+
+        try:
+            response = send(method, url, endpoint, **kwargs)
+
+        except requests.exceptions.ConnectionError:
+            if attempt == GITHUB_MAX_RETRIES:
+                raise
+            reason, wait = "connection", BACKOFF_BASE * 2 ** attempt
+
+        else:
+            if is_rate_limited(response):
+                reason, wait = "rate_limit", rate_limit_wait(response, attempt)
+            elif response.status_code in RETRY_STATUSES:
+                reason, wait = "server_error", BACKOFF_BASE * 2 ** attempt
+            else:
+                return response
+
+            if attempt == GITHUB_MAX_RETRIES or wait > GITHUB_MAX_BACKOFF:
+                return response
+
+        GITHUB_RETRIES.inc(method=method, endpoint=endpoint, reason=reason)
+        GITHUB_BACKOFF_SECONDS.inc(wait, reason=reason)
+
+        time.sleep(wait)
+
+
+# ==========================================
+# ASYNC VARIANT (EVENT LOOP)
+# ==========================================
+#
+# github_request_async makes the same calls with the same limits, retries
+# and metrics, awaited on the running event loop over aiohttp. Responses
+# are read in full and wrapped so the helpers above apply unchanged.
+
+async_sessions = {}
+
+
+class AsyncResponse:
+
+    def __init__(self, status_code, headers, content):
+        self.status_code = status_code
+        self.headers = headers
+        self.content = content
+
+    @property
+    def text(self):
+        return self.content.decode("utf-8", errors="replace")
+
+    def json(self):
+        return json.loads(self.content)
+
+
+def async_session():
+    # One aiohttp session per event loop (the app runs a single loop).
+    loop = asyncio.get_running_loop()
+    aiohttp = load_aiohttp()
+
+    if loop not in async_sessions:
+        async_sessions[loop] = aiohttp.ClientSession(
+            connector=aiohttp.TCPConnector(limit=GITHUB_MAX_CONCURRENCY)
+        )
+
+    return async_sessions[loop]
+
+
+async def acquire_limiter():
+
+    # A slot of the shared LIMITER, without blocking the event loop: the
+    # semaphore is polled while the blocking calls hold every slot.
+    while not LIMITER.acquire(blocking=False):
+        await asyncio.sleep(LIMITER_POLL_SECONDS)
+
+
+async def send_async(method, url, endpoint, **kwargs):
+
+    await acquire_limiter()
+
+    try:
+        start = time.perf_counter()
+
+        try:
+            async with async_session().request(method, url, **kwargs) as raw:
+                response = AsyncResponse(raw.status, raw.headers, await raw.read())
+        finally:
+            GITHUB_SECONDS.observe(time.perf_counter() - start, method=method, endpoint=endpoint)
+
+    finally:
+        LIMITER.release()
+
+    GITHUB_REQUESTS.inc(method=method, endpoint=endpoint, status=response.status_code)
+    note_rate_limit(response)
+
+    return response
+
+
+async def github_request_async(method, url, **kwargs):
+
+    endpoint = api_endpoint(url)
+    aiohttp = load_aiohttp()
+    kwargs["timeout"] = aiohttp.ClientTimeout(total=kwargs.get("timeout", GITHUB_TIMEOUT))
+
+    for attempt in range(GITHUB_MAX_RETRIES + 1):
+
+        wait = quota_wait()
+        if wait:
+            await asyncio.sleep(wait)
+
+        try:
+            response = await send_async(method, url, endpoint, **kwargs)
+
+        except aiohttp.ClientConnectionError:
+            if attempt == GITHUB_MAX_RETRIES:
+                raise
+            reason, wait = "connection", BACKOFF_BASE * 2 ** attempt
+
+        else:
+            if is_rate_limited(response):
+                reason, wait = "rate_limit", rate_limit_wait(response, attempt)
+            elif response.status_code in RETRY_STATUSES:
+                reason, wait = "server_error", BACKOFF_BASE * 2 ** attempt
+            else:
+                return response
+
+            if attempt == GITHUB_MAX_RETRIES or wait > GITHUB_MAX_BACKOFF:
+                return response
+
+        GITHUB_RETRIES.inc(method=method, endpoint=endpoint, reason=reason)
+        GITHUB_BACKOFF_SECONDS.inc(wait, reason=reason)
+
+        await asyncio.sleep(wait)
@@ -1,70 +1,392 @@
-import os
 import base64
-import requests
-from datetime import datetime
-import requests
+import asyncio
+from datetime import datetime, timedelta
+from concurrent.futures import ThreadPoolExecutor
 
+from github_client import (
+    GITHUB_API,
+    github_request,
+    github_request_async,
+    github_headers,
+    load_aiohttp
+)
 
-def upload_file(repo, token, file_path, repo_path):
+BRANCH = "main"
+RAW_URL = "https://raw.githubusercontent.com"
+BLOB_WORKERS = 8
+REF_UPDATE_RETRIES = 3
 
-    with open(file_path, "rb") as f:
-        content = base64.b64encode(f.read()).decode()
 
-    url = f"https://api.github.com/repos/{repo}/contents/{repo_path}"
+class RunNotFoundError(LookupError):
+    pass
 
-    headers = {
-        "Authorization": f"Bearer {token}",
-        "Accept": "application/vnd.github+json"
-    }
 
-    data = {
-        "message": f"Upload {repo_path}",
-        "content": content
-    }
+# ==========================================
+# SINGLE COMMIT UPLOAD (GIT DATA API)
+# ==========================================
 
-    response = requests.put(url, json=data, headers=headers)
+def create_blob(repo, token, content):
 
-    if response.status_code not in [200, 201]:
-        raise Exception(f"GitHub Upload Failed: {response.text}")
+    response = github_request(
+        "POST",
+        f"{GITHUB_API}/repos/{repo}/git/blobs",
+        json={"content": base64.b64encode(content).decode(), "encoding": "base64"},
+        headers=github_headers(token)
+    )
 
-    return repo_path
+    if response.status_code != 201:
+        raise Exception(f"GitHub Blob Upload Failed: {response.text}")
 
+    return response.json()["sha"]
 
-def upload_folder_to_github(folder_path, repo, token):
 
-    timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
-    uploaded_files = []
+async def create_blob_async(repo, token, content):
 
-    for root, dirs, files in os.walk(folder_path):
-        for file in files:
+    response = await github_request_async(
+        "POST",
+        f"{GITHUB_API}/repos/{repo}/git/blobs",
+        json={"content": base64.b64encode(content).decode(), "encoding": "base64"},
+        headers=github_headers(token)
+    )
 
-            full_path = os.path.join(root, file)
-            relative_path = os.path.relpath(full_path, folder_path)
+    if response.status_code != 201:
+        raise Exception(f"GitHub Blob Upload Failed: {response.text}")
 
-            # ✅ FIX: Convert Windows backslashes to forward slashes
-            relative_path = relative_path.replace("\\", "/")
+    return response.json()["sha"]
 
-            repo_path = f"validation_results/validation_{timestamp}/{relative_path}"
 
-            upload_file(repo, token, full_path, repo_path)
+def get_branch_head(repo, token, branch=BRANCH):
 
-            uploaded_files.append(repo_path)
+    response = github_request(
+        "GET",
+        f"{GITHUB_API}/repos/{repo}/git/ref/heads/{branch}",
+        headers=github_headers(token)
+    )
 
-    return uploaded_files, timestamp
+    if response.status_code != 200:
+        raise Exception(f"GitHub Ref Lookup Failed: {response.text}")
+
+    commit_sha = response.json()["object"]["sha"]
 
+    response = github_request(
+        "GET",
+        f"{GITHUB_API}/repos/{repo}/git/commits/{commit_sha}",
+        headers=github_headers(token)
+    )
 
+    if response.status_code != 200:
+        raise Exception(f"GitHub Commit Lookup Failed: {response.text}")
 
+    return commit_sha, response.json()["tree"]["sha"]
 
-def get_folder_contents(repo, token, path):
 
-    url = f"https://api.github.com/repos/{repo}/contents/{path}"
+def read_file(repo, token, path, ref=BRANCH):
+
+    # Raw file bytes at ref, or None when the file does not exist.
+    response = github_request(
+        "GET",
+        f"{GITHUB_API}/repos/{repo}/contents/{path}",
+        params={"ref": ref},
+        headers={**github_headers(token), "Accept": "application/vnd.github.raw+json"}
+    )
+
+    if response.status_code == 404:
+        return None
+
+    if response.status_code != 200:
+        raise Exception(f"GitHub File Read Failed: {response.text}")
+
+    return response.content
+
 
-    headers = {
-        "Authorization": f"Bearer {token}",
-        "Accept": "application/vnd.github+json"
-    }
+def file_size(repo, token, path, ref=BRANCH):
 
-    response = requests.get(url, headers=headers)
+    # Size in bytes at ref, or None when the file does not exist.
+    response = github_request(
+        "GET",
+        f"{GITHUB_API}/repos/{repo}/contents/{path}",
+        params={"ref": ref},
+        headers={**github_headers(token), "Accept": "application/vnd.github.object+json"}
+    )
+
+    if response.status_code == 404:
+        return None
+
+    if response.status_code != 200:
+        raise Exception(f"GitHub File Lookup Failed: {response.text}")
+
+    return response.json()["size"]
+
+
+def read_file_range(repo, token, path, start, length, ref):
+
+    # Bytes [start, start + length) of a file. ref should be a commit sha:
+    # raw URLs for a branch are cached and may lag behind it.
+    response = github_request(
+        "GET",
+        f"{RAW_URL}/{repo}/{ref}/{path}",
+        headers={
+            "Authorization": f"Bearer {token}",
+            "Range": f"bytes={start}-{start + length - 1}"
+        }
+    )
+
+    if response.status_code == 200:
+        # Range ignored: the whole file came back.
+        return response.content[start:start + length]
+
+    if response.status_code != 206:
+        raise Exception(f"GitHub Range Read Failed: {response.status_code} {response.text[:200]}")
+
+    return response.content
+
+
+def commit_tree(repo, token, tree_entries, message, branch=BRANCH, extra_entries=None):
+
+    # Builds one tree on top of the branch head and fast-forwards the branch
+    # to a single new commit. If another upload moved the head in between,
+    # the tree is rebuilt on the new head and the update retried.
+    # tree_entries and message may be functions of (head_sha, head_tree)
+    # when they depend on what is already there (free run folders, files
+    # to delete); extra_entries(head_sha) may add entries derived from the
+    # head (e.g. the run manifest). All are recomputed per retry. A tree
+    # identical to the head's is not committed; the head is returned.
+    for attempt in range(REF_UPDATE_RETRIES):
+
+        head_sha, head_tree = get_branch_head(repo, token, branch)
+
+        entries = list(tree_entries(head_sha, head_tree) if callable(tree_entries) else tree_entries)
+        if extra_entries:
+            entries.extend(extra_entries(head_sha))
+
+        commit_message = message(head_sha, head_tree) if callable(message) else message
+
+        response = github_request(
+            "POST",
+            f"{GITHUB_API}/repos/{repo}/git/trees",
+            json={"base_tree": head_tree, "tree": entries},
+            headers=github_headers(token)
+        )
+
+        if response.status_code != 201:
+            raise Exception(f"GitHub Tree Create Failed: {response.text}")
+
+        tree_sha = response.json()["sha"]
+
+        if tree_sha == head_tree:
+            return head_sha
+
+        response = github_request(
+            "POST",
+            f"{GITHUB_API}/repos/{repo}/git/commits",
+            json={
+                "message": commit_message,
+                "tree": tree_sha,
+                "parents": [head_sha]
+            },
+            headers=github_headers(token)
+        )
+
+        if response.status_code != 201:
+            raise Exception(f"GitHub Commit Create Failed: {response.text}")
+
+        commit_sha = response.json()["sha"]
+
+        response = github_request(
+            "PATCH",
+            f"{GITHUB_API}/repos/{repo}/git/refs/heads/{branch}",
+            json={"sha": commit_sha, "force": False},
+            headers=github_headers(token)
+        )
+
+        if response.status_code == 200:
+            return commit_sha
+
+        if response.status_code != 422:
+            raise Exception(f"GitHub Ref Update Failed: {response.text}")
+
+    raise Exception("GitHub Ref Update Failed: branch head kept moving")
+
+
+def run_entries(timestamp, blobs):
+
+    # blobs: [(relative path, blob sha)] of one run
+    return [
+        {"path": f"validation_results/validation_{timestamp}/{relative_path}", "mode": "100644", "type": "blob", "sha": sha}
+        for relative_path, sha in blobs
+    ]
+
+
+def tree_folders(repo, token, tree_sha):
+
+    # {name: sha} of the folders directly inside a tree.
+    response = github_request(
+        "GET",
+        f"{GITHUB_API}/repos/{repo}/git/trees/{tree_sha}",
+        headers=github_headers(token)
+    )
+
+    if response.status_code != 200:
+        raise Exception(f"GitHub Tree Lookup Failed: {response.text}")
+
+    return {item["path"]: item["sha"] for item in response.json()["tree"] if item["type"] == "tree"}
+
+
+def run_folders(repo, token, head_tree):
+
+    # Names of the run folders ("validation_<timestamp>") at a head tree.
+    results_tree = tree_folders(repo, token, head_tree).get("validation_results")
+
+    if results_tree is None:
+        return set()
+
+    return set(tree_folders(repo, token, results_tree))
+
+
+def free_timestamps(count, taken):
+
+    # count timestamps from now on, one second apart, skipping run folders
+    # that already exist (as LocalStorage.next_timestamp does).
+    moment = datetime.now()
+    timestamps = []
+
+    while len(timestamps) < count:
+        timestamp = moment.strftime("%Y%m%d_%H%M%S")
+        if f"validation_{timestamp}" not in taken:
+            timestamps.append(timestamp)
+        moment += timedelta(seconds=1)
+
+    return timestamps
+
+
+def commit_runs(repo, token, run_blobs, extra_entries=None, timestamp=None):
+
+    # One commit for the runs in run_blobs (a [(relative path, blob sha)]
+    # list per run). New runs take the next free folders at the head being
+    # committed on, chosen again on every retry, so two uploads in the
+    # same second never share a folder. With timestamp, the one run
+    # overwrites that existing run's files in place, and RunNotFoundError
+    # is raised if the head has no such run.
+    # extra_entries(head_sha, timestamps) adds files to the same commit.
+    # Returns the timestamps used.
+    chosen = {"timestamps": [timestamp] if timestamp else []}
+
+    def entries(head_sha, head_tree):
+
+        if not timestamp:
+            chosen["timestamps"] = free_timestamps(len(run_blobs), run_folders(repo, token, head_tree))
+
+        elif f"validation_{timestamp}" not in run_folders(repo, token, head_tree):
+            raise RunNotFoundError(f"No run folder validation_results/validation_{timestamp}")
+
+        return [
+            entry
+            for blobs, run_timestamp in zip(run_blobs, chosen["timestamps"])
+            for entry in run_entries(run_timestamp, blobs)
+        ]
+
+    def message(head_sha, head_tree):
+
+        if timestamp:
+            return f"Update validation_{timestamp}"
+
+        if len(run_blobs) == 1:
+            return f"Upload validation_{chosen['timestamps'][0]}"
+
+        return f"Upload {len(run_blobs)} validation runs"
+
+    commit_tree(
+        repo,
+        token,
+        entries,
+        message=message,
+        extra_entries=(lambda head_sha: extra_entries(head_sha, chosen["timestamps"])) if extra_entries else None
+    )
+
+    return chosen["timestamps"]
+
+
+def run_paths(artifacts, timestamp):
+    return [f"validation_results/validation_{timestamp}/{relative_path}" for relative_path in artifacts]
+
+
+def upload_artifacts_to_github(artifacts, repo, token, extra_entries=None, timestamp=None):
+
+    # artifacts: {relative path: bytes}, e.g. from
+    # validator.build_validation_artifacts. Nothing touches the disk.
+    # extra_entries(head_sha, timestamp) adds files to the same commit.
+    # Passing the timestamp of an existing run overwrites its files in place.
+    with ThreadPoolExecutor(max_workers=BLOB_WORKERS) as pool:
+        blob_shas = list(pool.map(
+            lambda content: create_blob(repo, token, content),
+            artifacts.values()
+        ))
+
+    timestamp, = commit_runs(
+        repo,
+        token,
+        [list(zip(artifacts, blob_shas))],
+        extra_entries=(lambda head_sha, timestamps: extra_entries(head_sha, timestamps[0])) if extra_entries else None,
+        timestamp=timestamp
+    )
+
+    return run_paths(artifacts, timestamp), timestamp
+
+
+async def upload_artifacts_to_github_async(artifacts, repo, token, extra_entries=None, timestamp=None):
+
+    # Same as upload_artifacts_to_github, awaited on the event loop: blobs
+    # go up concurrently over aiohttp. The commit itself is a short chain
+    # of dependent calls (plus the manifest read in extra_entries) and runs
+    # on the blocking client in a thread. Without aiohttp the whole upload
+    # runs in a thread.
+    if load_aiohttp() is None:
+        return await asyncio.to_thread(
+            upload_artifacts_to_github, artifacts, repo, token, extra_entries, timestamp
+        )
+
+    blob_shas = await asyncio.gather(*(
+        create_blob_async(repo, token, content) for content in artifacts.values()
+    ))
+
+    timestamp, = await asyncio.to_thread(
+        commit_runs,
+        repo,
+        token,
+        [list(zip(artifacts, blob_shas))],
+        extra_entries=(lambda head_sha, timestamps: extra_entries(head_sha, timestamps[0])) if extra_entries else None,
+        timestamp=timestamp
+    )
+
+    return run_paths(artifacts, timestamp), timestamp
+
+
+def upload_runs_to_github(runs, repo, token, extra_entries=None):
+
+    # Several new runs in one commit. runs: list of artifacts dicts as for
+    # upload_artifacts_to_github; each gets its own free folder.
+    # extra_entries(head_sha, timestamps) adds files to the same commit.
+    # Identical files are uploaded as one blob.
+    contents = list(dict.fromkeys(content for artifacts in runs for content in artifacts.values()))
+
+    with ThreadPoolExecutor(max_workers=BLOB_WORKERS) as pool:
+        shas = dict(zip(contents, pool.map(lambda content: create_blob(repo, token, content), contents)))
+
+    timestamps = commit_runs(
+        repo,
+        token,
+        [[(relative_path, shas[content]) for relative_path, content in artifacts.items()] for artifacts in runs],
+        extra_entries=extra_entries
+    )
+
+    return [(run_paths(artifacts, timestamp), timestamp) for artifacts, timestamp in zip(runs, timestamps)]
+
+
+def get_folder_contents(repo, token, path):
+
+    url = f"{GITHUB_API}/repos/{repo}/contents/{path}"
+
+    response = github_request("GET", url, headers=github_headers(token))
 
     if response.status_code == 404:
         return []
@@ -75,34 +397,84 @@ def get_folder_contents(repo, token, path):
     return response.json()
 
 
-def delete_file(repo, token, path, sha):
+# ==========================================
+# SINGLE COMMIT DELETE (GIT DATA API)
+# ==========================================
 
-    url = f"https://api.github.com/repos/{repo}/contents/{path}"
+def list_tree_recursive(repo, token, path, head_tree=None):
 
-    headers = {
-        "Authorization": f"Bearer {token}",
-        "Accept": "application/vnd.github+json"
-    }
+    # One recursive tree read instead of one Contents API call per folder.
+    if head_tree is None:
+        _, head_tree = get_branch_head(repo, token)
 
-    data = {
-        "message": f"Delete {path}",
-        "sha": sha
-    }
+    response = github_request(
+        "GET",
+        f"{GITHUB_API}/repos/{repo}/git/trees/{head_tree}",
+        params={"recursive": "1"},
+        headers=github_headers(token)
+    )
 
-    response = requests.delete(url, json=data, headers=headers)
+    if response.status_code != 200:
+        raise Exception(f"GitHub Tree Lookup Failed: {response.text}")
 
-    if response.status_code not in [200]:
-        raise Exception(response.text)
+    result = response.json()
+    prefix = path.rstrip("/") + "/"
+
+    if result.get("truncated"):
+        return list_folder_walk(repo, token, path)
+
+    files = [
+        item["path"] for item in result["tree"]
+        if item["type"] == "blob" and item["path"].startswith(prefix)
+    ]
+    folders = [
+        item["path"] for item in result["tree"]
+        if item["type"] == "tree" and item["path"].startswith(prefix)
+    ]
+
+    return files, folders
 
 
-def delete_folder_recursive(repo, token, folder_path):
+def list_folder_walk(repo, token, path):
 
-    contents = get_folder_contents(repo, token, folder_path)
+    # Fallback for trees too large for a single recursive read.
+    files = []
+    folders = []
 
-    for item in contents:
+    for item in get_folder_contents(repo, token, path):
 
         if item["type"] == "file":
-            delete_file(repo, token, item["path"], item["sha"])
+            files.append(item["path"])
 
         elif item["type"] == "dir":
-            delete_folder_recursive(repo, token, item["path"])
\ No newline at end of file
+            folders.append(item["path"])
+            sub_files, sub_folders = list_folder_walk(repo, token, item["path"])
+            files.extend(sub_files)
+            folders.extend(sub_folders)
+
+    return files, folders
+
+
+def delete_folder_single_commit(repo, token, folder_path, extra_entries=None):
+
+    # The files are listed from the head being committed on, again on
+    # every retry. The manifest change (extra_entries) is committed even
+    # when the folder is already gone, so stale entries can be removed;
+    # when neither changes anything, commit_tree makes no commit.
+    listed = {"files": [], "folders": []}
+
+    def entries(head_sha, head_tree):
+
+        listed["files"], listed["folders"] = list_tree_recursive(repo, token, folder_path, head_tree)
+
+        return [
+            {"path": path, "mode": "100644", "type": "blob", "sha": None}
+            for path in listed["files"]
+        ]
+
+    commit_tree(repo, token, entries, message=f"Delete {folder_path}", extra_entries=extra_entries)
+
+    return {
+        "deleted_files": len(listed["files"]),
+        "deleted_folders": len(listed["folders"])
+    }
\ No newline at end of file
@@ -0,0 +1,33 @@
+import os
+
+# ==========================================
+# GUNICORN SETTINGS
+# ==========================================
+#
+# gunicorn reads this file from the working directory (Procfile:
+# gunicorn app:app). gthread workers let one worker hold several requests
+# while they wait on the async I/O path (VALIDATION_ASYNC_IO).
+
+worker_class = "gthread"
+threads = int(os.getenv("GUNICORN_THREADS", "8"))
+
+# One worker process, whatever WEB_CONCURRENCY says: the job registry
+# (/jobs/<id>), the result cache and the manifest cache live in the
+# worker's memory. With several workers a job poll could land on a worker
+# that never saw the job, and a delete would leave stale cached results
+# in the others. Concurrency comes from the threads, the async runner and
+# the validation process pools.
+workers = 1
+
+# GUNICORN_PRELOAD=1 imports the app and the data stack (validator:
+# pandas, numpy, openpyxl) once in the master. Workers are forked with it
+# already loaded, share those pages, and serve their first validation
+# without the import. Code changes then need a restart instead of a HUP.
+preload_app = os.getenv("GUNICORN_PRELOAD", "0") == "1"
+
+
+def when_ready(server):
+
+    # Runs in the master before the first worker is forked.
+    if preload_app:
+        import validator  # noqa: F401
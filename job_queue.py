@@ -0,0 +1,155 @@
+import time
+import uuid
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+
+class QueueFullError(Exception):
+    pass
+
+
+# ==========================================
+# BOUNDED BACKGROUND JOB QUEUE
+# ==========================================
+
+class JobQueue:
+
+    def __init__(self, max_workers=2, max_pending=8, job_ttl=3600):
+
+        self.max_workers = max_workers
+        self.max_pending = max_pending
+        self.job_ttl = job_ttl
+
+        self.executor = ThreadPoolExecutor(
+            max_workers=max_workers,
+            thread_name_prefix="validation-job"
+        )
+
+        self.jobs = {}
+        self.lock = threading.Lock()
+
+    def active_count(self):
+        return sum(
+            1 for job in self.jobs.values()
+            if job["status"] in ("queued", "running")
+        )
+
+    def prune(self):
+
+        # Finished jobs are kept for job_ttl seconds so clients can poll them.
+        cutoff = time.time() - self.job_ttl
+
+        expired = [
+            job_id for job_id, job in self.jobs.items()
+            if job["finished_at"] and job["finished_at"] < cutoff
+        ]
+
+        for job_id in expired:
+            del self.jobs[job_id]
+
+    def submit(self, fn, *args, **kwargs):
+
+        with self.lock:
+
+            self.prune()
+
+            # Backpressure: refuse new work once every worker is busy and
+            # the waiting line is full, instead of queueing without bound.
+            if self.active_count() >= self.max_workers + self.max_pending:
+                raise QueueFullError("Validation queue is full, retry later")
+
+            job_id = self.new_job()
+
+        self.executor.submit(self.run, job_id, fn, args, kwargs)
+
+        return job_id
+
+    def new_job(self):
+
+        job_id = uuid.uuid4().hex
+
+        self.jobs[job_id] = {
+            "job_id": job_id,
+            "status": "queued",
+            "created_at": time.time(),
+            "started_at": None,
+            "finished_at": None,
+            "result": None,
+            "error": None
+        }
+
+        return job_id
+
+    def submit_async(self, runner, coro_fn, *args):
+
+        # Same bookkeeping for a coroutine run on an AsyncRunner
+        # (async_pipeline); its capacity is the runner's in-flight limit
+        # rather than this queue's worker threads.
+        with self.lock:
+            self.prune()
+            job_id = self.new_job()
+
+        try:
+            runner.submit(self.run_async(job_id, coro_fn, args))
+
+        except QueueFullError:
+            with self.lock:
+                del self.jobs[job_id]
+            raise
+
+        return job_id
+
+    def run(self, job_id, fn, args, kwargs):
+
+        job = self.jobs[job_id]
+        job["status"] = "running"
+        job["started_at"] = time.time()
+
+        try:
+            job["result"] = fn(*args, **kwargs)
+            job["status"] = "succeeded"
+
+        except Exception as e:
+            job["error"] = str(e)
+            job["status"] = "failed"
+
+        finally:
+            job["finished_at"] = time.time()
+
+    async def run_async(self, job_id, coro_fn, args):
+
+        job = self.jobs[job_id]
+        job["status"] = "running"
+        job["started_at"] = time.time()
+
+        try:
+            job["result"] = await coro_fn(*args)
+            job["status"] = "succeeded"
+
+        except Exception as e:
+            job["error"] = str(e)
+            job["status"] = "failed"
+
+        finally:
+            job["finished_at"] = time.time()
+
+    def get(self, job_id):
+
+        with self.lock:
+            job = self.jobs.get(job_id)
+            return dict(job) if job else None
+
+    def position(self, job_id):
+
+        # Number of queued jobs submitted before this one.
+        with self.lock:
+            job = self.jobs.get(job_id)
+
+            if not job or job["status"] != "queued":
+                return 0
+
+            return sum(
+                1 for other in self.jobs.values()
+                if other["status"] == "queued"
+                and other["created_at"] < job["created_at"]
+            )
@@ -0,0 +1,218 @@
+import json
+import time
+import threading
+
+from run_stats import build_stats, update_stats
+from github_uploader import (
+    read_file,
+    list_tree_recursive
+)
+
+# ==========================================
+# RUN MANIFEST
+# ==========================================
+#
+# One JSON file listing every validation run with the key stats from its
+# validation_meta.json, plus cross-run aggregates (run_stats). It lives
+# outside validation_results/ so deleting every run folder does not delete
+# it, and it is rewritten inside the same commit that uploads or deletes
+# runs: {"runs": [...], "stats": {...}}.
+
+BASE_PATH = "validation_results"
+MANIFEST_PATH = "validation_manifest.json"
+
+
+def read_manifest(repo, token, ref):
+
+    content = read_file(repo, token, MANIFEST_PATH, ref)
+
+    if content is None:
+        return None
+
+    manifest = json.loads(content)
+
+    if "stats" not in manifest:
+        manifest["stats"] = build_stats(manifest["runs"])
+
+    return manifest
+
+
+def runs_from_folders(names):
+
+    # Bare entries (no stats) for run folders found by listing storage.
+    runs = [
+        {"folder": name, "timestamp": name.replace("validation_", "", 1)}
+        for name in names
+        if name.startswith("validation_")
+    ]
+
+    return sorted(runs, key=lambda run: run["timestamp"], reverse=True)
+
+
+def bootstrap_runs(repo, token):
+
+    # Repos created before the manifest existed: list the run folders once
+    # (without stats) so the manifest starts out complete.
+    _, folders = list_tree_recursive(repo, token, BASE_PATH)
+
+    names = [path[len(BASE_PATH) + 1:] for path in folders]
+
+    return runs_from_folders([name for name in names if "/" not in name])
+
+
+def run_entry(timestamp, meta):
+
+    total_ce = meta.get("total_ce_entries") or 0
+    matches = meta.get("total_valid_matches") or 0
+
+    return {
+        "folder": f"validation_{timestamp}",
+        "timestamp": timestamp,
+        "generated_at": meta.get("generated_at"),
+        "total_ce_entries": total_ce,
+        "total_pe_entries": meta.get("total_pe_entries"),
+        "total_index_entries": meta.get("total_index_entries"),
+        "total_valid_matches": matches,
+        "match_percentage": round(matches / total_ce * 100, 2) if total_ce else 0,
+        "symbols": sorted(set(
+            meta.get("ce_symbols", []) + meta.get("pe_symbols", []) + meta.get("index_symbols", [])
+        )),
+        "min_time": meta.get("ce_min_time"),
+        "max_time": meta.get("ce_max_time"),
+        "formats": meta.get("formats"),
+        "archive": meta.get("archive")
+    }
+
+
+def manifest_from_runs(runs):
+    return {"runs": runs, "stats": build_stats(runs)}
+
+
+def bootstrap_manifest(repo, token):
+    return manifest_from_runs(bootstrap_runs(repo, token))
+
+
+def apply_change(manifest, change, *args):
+
+    # change(runs, *args) returns the new run list; the aggregates are
+    # updated by the difference only.
+    runs = change(manifest["runs"], *args)
+
+    return {
+        "runs": runs,
+        "stats": update_stats(manifest["stats"], manifest["runs"], runs)
+    }
+
+
+def manifest_hook(repo, token, change, result):
+
+    # Returns an extra_entries callback for github_uploader.commit_tree.
+    # It reads the manifest at the head being committed on, applies the
+    # change and writes the new manifest into the same tree. The final
+    # manifest is left in result["manifest"].
+    def hook(head_sha, *args):
+
+        manifest = read_manifest(repo, token, head_sha) or bootstrap_manifest(repo, token)
+        manifest = apply_change(manifest, change, *args)
+
+        result["manifest"] = manifest
+
+        return [{
+            "path": MANIFEST_PATH,
+            "mode": "100644",
+            "type": "blob",
+            "content": json.dumps(manifest, indent=1)
+        }]
+
+    return hook
+
+
+def add_run(meta):
+
+    def change(runs, timestamp):
+        entry = run_entry(timestamp, meta)
+        runs = [run for run in runs if run["folder"] != entry["folder"]]
+        return sorted([entry] + runs, key=lambda run: run["timestamp"], reverse=True)
+
+    return change
+
+
+def add_runs(metas):
+
+    # Several runs stored in one write; change(runs, timestamps) takes
+    # their timestamps in the same order as metas.
+    def change(runs, timestamps):
+        for meta, timestamp in zip(metas, timestamps):
+            runs = add_run(meta)(runs, timestamp)
+        return runs
+
+    return change
+
+
+def remove_runs(folder_path):
+
+    # folder_path is either BASE_PATH (everything) or one run folder.
+    def change(runs):
+        if folder_path.rstrip("/") == BASE_PATH:
+            return []
+        return [run for run in runs if f"{BASE_PATH}/{run['folder']}" != folder_path]
+
+    return change
+
+
+# ==========================================
+# IN-PROCESS LISTING CACHE
+# ==========================================
+
+class ManifestCache:
+
+    def __init__(self, ttl=60):
+        self.ttl = ttl
+        self.manifest = None
+        self.loaded_at = 0
+        self.lock = threading.Lock()
+
+    def get(self, loader):
+
+        with self.lock:
+            if self.manifest is not None and time.time() - self.loaded_at < self.ttl:
+                return self.manifest
+
+        manifest = loader()
+        self.set(manifest)
+
+        return manifest
+
+    def set(self, manifest):
+        with self.lock:
+            self.manifest = manifest
+            self.loaded_at = time.time()
+
+    def invalidate(self):
+        with self.lock:
+            self.manifest = None
+
+
+def load_manifest(repo, token):
+    return read_manifest(repo, token, "main") or bootstrap_manifest(repo, token)
+
+
+def filter_runs(runs, query=None, symbol=None, date_from=None, date_to=None):
+
+    # date_from / date_to compare against the run timestamp prefix
+    # (YYYYMMDD or YYYYMMDD_HHMMSS).
+    selected = runs
+
+    if query:
+        selected = [run for run in selected if query.lower() in run["folder"].lower()]
+
+    if symbol:
+        selected = [run for run in selected if symbol in run.get("symbols", [])]
+
+    if date_from:
+        selected = [run for run in selected if run["timestamp"] >= date_from]
+
+    if date_to:
+        selected = [run for run in selected if run["timestamp"][:len(date_to)] <= date_to]
+
+    return selected
@@ -0,0 +1,234 @@
+import time
+import threading
+from contextlib import contextmanager
+
+
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60, 120)
+ROW_BUCKETS = (10, 100, 1000, 10000, 50000, 100000, 500000, 1000000)
+
+
+# ==========================================
+# MINIMAL PROMETHEUS METRICS
+# ==========================================
+
+def escape_label(value):
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def format_labels(names, values, extra=None):
+
+    pairs = list(zip(names, values))
+
+    if extra:
+        pairs.append(extra)
+
+    if not pairs:
+        return ""
+
+    body = ",".join(
+        f'{name}="{escape_label(value)}"'
+        for name, value in pairs
+    )
+
+    return "{" + body + "}"
+
+
+class Counter:
+
+    kind = "counter"
+
+    def __init__(self, name, help_text, labels=()):
+        self.name = name
+        self.help_text = help_text
+        self.labels = tuple(labels)
+        self.values = {}
+        self.lock = threading.Lock()
+
+    def inc(self, amount=1, **labels):
+        key = tuple(labels.get(name, "") for name in self.labels)
+        with self.lock:
+            self.values[key] = self.values.get(key, 0) + amount
+
+    def samples(self):
+        with self.lock:
+            return [
+                (self.name + format_labels(self.labels, key), value)
+                for key, value in sorted(self.values.items())
+            ]
+
+
+class Gauge(Counter):
+
+    kind = "gauge"
+
+    def set(self, value, **labels):
+        key = tuple(labels.get(name, "") for name in self.labels)
+        with self.lock:
+            self.values[key] = value
+
+
+class Histogram:
+
+    kind = "histogram"
+
+    def __init__(self, name, help_text, labels=(), buckets=DEFAULT_BUCKETS):
+        self.name = name
+        self.help_text = help_text
+        self.labels = tuple(labels)
+        self.buckets = tuple(buckets)
+        self.values = {}
+        self.lock = threading.Lock()
+
+    def observe(self, value, **labels):
+
+        key = tuple(labels.get(name, "") for name in self.labels)
+
+        with self.lock:
+
+            entry = self.values.setdefault(key, [[0] * len(self.buckets), 0.0, 0])
+
+            for i, bound in enumerate(self.buckets):
+                if value <= bound:
+                    entry[0][i] += 1
+
+            entry[1] += value
+            entry[2] += 1
+
+    def samples(self):
+
+        lines = []
+
+        with self.lock:
+
+            for key, (counts, total, count) in sorted(self.values.items()):
+
+                for bound, bucket_count in zip(self.buckets, counts):
+                    lines.append((
+                        self.name + "_bucket" + format_labels(self.labels, key, ("le", bound)),
+                        bucket_count
+                    ))
+
+                lines.append((self.name + "_bucket" + format_labels(self.labels, key, ("le", "+Inf")), count))
+                lines.append((self.name + "_sum" + format_labels(self.labels, key), total))
+                lines.append((self.name + "_count" + format_labels(self.labels, key), count))
+
+        return lines
+
+
+REGISTRY = []
+
+
+def register(metric):
+    REGISTRY.append(metric)
+    return metric
+
+
+def render_metrics():
+
+    lines = []
+
+    for metric in REGISTRY:
+
+        lines.append(f"# HELP {metric.name} {metric.help_text}")
+        lines.append(f"# TYPE {metric.name} {metric.kind}")
+
+        for sample, value in metric.samples():
+            lines.append(f"{sample} {value}")
+
+    return "\n".join(lines) + "\n"
+
+
+# ==========================================
+# APPLICATION METRICS
+# ==========================================
+
+STAGE_SECONDS = register(Histogram(
+    "validation_stage_seconds",
+    "Time spent in each validation pipeline stage",
+    labels=("stage",)
+))
+
+STAGE_ROWS = register(Histogram(
+    "validation_rows",
+    "Rows handled per validation run",
+    labels=("kind",),
+    buckets=ROW_BUCKETS
+))
+
+GITHUB_REQUESTS = register(Counter(
+    "github_api_requests_total",
+    "GitHub API calls by endpoint and status",
+    labels=("method", "endpoint", "status")
+))
+
+GITHUB_SECONDS = register(Histogram(
+    "github_api_request_seconds",
+    "GitHub API call latency",
+    labels=("method", "endpoint")
+))
+
+GITHUB_RETRIES = register(Counter(
+    "github_api_retries_total",
+    "GitHub API calls retried, by reason (rate_limit, server_error, connection)",
+    labels=("method", "endpoint", "reason")
+))
+
+GITHUB_BACKOFF_SECONDS = register(Counter(
+    "github_api_backoff_seconds_total",
+    "Time spent waiting before GitHub API retries or for the quota to reset",
+    labels=("reason",)
+))
+
+GITHUB_RATE_REMAINING = register(Gauge(
+    "github_api_rate_limit_remaining",
+    "X-RateLimit-Remaining from the latest GitHub API response"
+))
+
+
+# ==========================================
+# PER-RUN STAGE TIMER
+# ==========================================
+
+class StageTimer:
+
+    def __init__(self):
+        self.timings = {}
+        self.row_counts = {}
+
+    @contextmanager
+    def stage(self, name):
+
+        start = time.perf_counter()
+
+        try:
+            yield
+        finally:
+            elapsed = time.perf_counter() - start
+            self.timings[name] = self.timings.get(name, 0.0) + elapsed
+            STAGE_SECONDS.observe(elapsed, stage=name)
+
+    def rows(self, kind, count):
+        self.row_counts[kind] = count
+        STAGE_ROWS.observe(count, kind=kind)
+
+    def adopt(self, other):
+
+        # Takes over stages recorded on a copy of this timer in another
+        # process, whose metrics never reached this process's registry.
+        for name, value in other.timings.items():
+            elapsed = value - self.timings.get(name, 0.0)
+            if elapsed > 0:
+                STAGE_SECONDS.observe(elapsed, stage=name)
+
+        for kind, count in other.row_counts.items():
+            if self.row_counts.get(kind) != count:
+                STAGE_ROWS.observe(count, kind=kind)
+
+        self.timings = dict(other.timings)
+        self.row_counts = dict(other.row_counts)
+
+    def as_dict(self):
+        return {
+            "timings_seconds": {name: round(value, 4) for name, value in self.timings.items()},
+            "row_counts": dict(self.row_counts)
+        }
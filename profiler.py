@@ -0,0 +1,163 @@
+import os
+import sys
+import time
+import threading
+from collections import Counter
+
+# ==========================================
+# SAMPLING STACK PROFILER
+# ==========================================
+#
+# StackSampler records the Python stack of the thread that enters it,
+# every `interval` seconds, from a background thread
+# (sys._current_frames). The profiled code runs untraced, so the cost is
+# one stack walk per sample, made while the sampler holds the GIL. Each
+# sample is weighted by the wall time since the previous one, so time
+# spent in C code that holds the GIL is not undercounted.
+#
+# Stacks start at the function that entered the sampler. They come out as
+#   collapsed()   "root;caller;leaf <microseconds>" lines (flamegraph.pl,
+#                 speedscope, inferno)
+#   report(n)     totals plus the top n functions by self and total time
+
+DEFAULT_INTERVAL = 0.005
+MAX_DEPTH = 256
+
+
+def frame_label(code):
+
+    # "qualname (dir/file.py:line)": the last two path parts keep
+    # site-packages and same-named modules apart.
+    path = "/".join(code.co_filename.replace(os.sep, "/").split("/")[-2:])
+
+    return f"{code.co_qualname} ({path}:{code.co_firstlineno})".replace(";", ":")
+
+
+class StackSampler:
+
+    def __init__(self, interval=DEFAULT_INTERVAL):
+        self.interval = interval
+        self.stacks = Counter()
+        self.samples = 0
+        self.sampling_seconds = 0.0
+        self.wall_seconds = 0.0
+        self.started = None
+        self.thread_id = None
+        self.root = None
+        self.stop_event = threading.Event()
+        self.thread = None
+
+    def __enter__(self):
+
+        self.thread_id = threading.get_ident()
+        self.root = sys._getframe(1)
+        self.started = time.perf_counter()
+
+        self.thread = threading.Thread(target=self.run, name="profile-sampler", daemon=True)
+        self.thread.start()
+
+        return self
+
+    def __exit__(self, *exc):
+
+        self.stop_event.set()
+        self.thread.join()
+
+        self.wall_seconds = time.perf_counter() - self.started
+        self.root = None
+
+    def stack(self, frame):
+
+        # Code objects from the entry frame down to the running one.
+        codes = []
+
+        while frame is not None and len(codes) < MAX_DEPTH:
+            codes.append(frame.f_code)
+            if frame is self.root:
+                break
+            frame = frame.f_back
+
+        return tuple(reversed(codes))
+
+    def run(self):
+
+        last = time.perf_counter()
+
+        while not self.stop_event.wait(self.interval):
+
+            start = time.perf_counter()
+            frame = sys._current_frames().get(self.thread_id)
+
+            if frame is not None:
+                self.stacks[self.stack(frame)] += start - last
+                self.samples += 1
+
+            last = start
+            self.sampling_seconds += time.perf_counter() - start
+
+    def labelled(self):
+
+        # {("root", ..., "leaf") labels: seconds}
+        labelled = Counter()
+
+        for codes, seconds in self.stacks.items():
+            labelled[tuple(frame_label(code) for code in codes)] += seconds
+
+        return labelled
+
+    def collapsed(self):
+
+        return "".join(
+            f"{';'.join(labels)} {round(seconds * 1e6)}\n"
+            for labels, seconds in sorted(self.labelled().items())
+            if labels and round(seconds * 1e6)
+        )
+
+    def report(self, top=25, focus=None):
+
+        # focus: {group: function names (co_name)}; the time spent inside
+        # any of a group's functions is reported under the group.
+        focus = focus or {}
+        self_seconds = Counter()
+        total_seconds = Counter()
+        focus_seconds = {group: 0.0 for group in focus}
+
+        for codes, seconds in self.stacks.items():
+
+            if not codes:
+                continue
+
+            self_seconds[frame_label(codes[-1])] += seconds
+
+            # Recursive functions count once per stack.
+            for label in {frame_label(code) for code in codes}:
+                total_seconds[label] += seconds
+
+            names = {code.co_name for code in codes}
+
+            for group, functions in focus.items():
+                if names.intersection(functions):
+                    focus_seconds[group] += seconds
+
+        sampled = sum(self.stacks.values())
+
+        def ranking(counter):
+            return [
+                {
+                    "function": label,
+                    "seconds": round(seconds, 4),
+                    "percent": round(seconds / sampled * 100, 2) if sampled else 0
+                }
+                for label, seconds in counter.most_common(top)
+            ]
+
+        return {
+            "interval_seconds": self.interval,
+            "samples": self.samples,
+            "wall_seconds": round(self.wall_seconds, 4),
+            "sampled_seconds": round(sampled, 4),
+            "overhead_seconds": round(self.sampling_seconds, 4),
+            "focus_seconds": {group: round(seconds, 4) for group, seconds in focus_seconds.items()},
+            "top_self": ranking(self_seconds),
+            "top_total": ranking(total_seconds)
+        }
@@ -0,0 +1,106 @@
+import json
+import time
+import hashlib
+import threading
+from collections import OrderedDict
+
+
+# Only these fields of a trade affect the validation output.
+TRADE_FIELDS = ("symbol", "tradeNo", "dateTime", "signal", "type")
+
+
+def input_key(ce_data, pe_data, index_data):
+
+    # Content hash of the normalized inputs: unused fields and key order are
+    # ignored, row order is kept because it decides ties between candidates.
+    digest = hashlib.sha256()
+
+    for leg in (ce_data, pe_data, index_data):
+
+        rows = [
+            [row.get(field) for field in TRADE_FIELDS] if isinstance(row, dict) else row
+            for row in leg
+        ]
+
+        digest.update(json.dumps(rows, separators=(",", ":"), default=str).encode())
+        digest.update(b"\0")
+
+    return digest.hexdigest()
+
+
+# ==========================================
+# LRU + TTL RESULT CACHE
+# ==========================================
+
+class ResultCache:
+
+    def __init__(self, max_entries=128, ttl=86400):
+
+        self.max_entries = max_entries
+        self.ttl = ttl
+
+        self.entries = OrderedDict()
+        self.lock = threading.Lock()
+
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def get(self, key):
+
+        with self.lock:
+
+            entry = self.entries.get(key)
+
+            if entry and entry[0] < time.time() - self.ttl:
+                del self.entries[key]
+                self.evictions += 1
+                entry = None
+
+            if entry is None:
+                self.misses += 1
+                return None
+
+            self.entries.move_to_end(key)
+            self.hits += 1
+
+            return entry[1]
+
+    def put(self, key, value):
+
+        if self.max_entries <= 0:
+            return
+
+        with self.lock:
+
+            self.entries[key] = (time.time(), value)
+            self.entries.move_to_end(key)
+
+            while len(self.entries) > self.max_entries:
+                self.entries.popitem(last=False)
+                self.evictions += 1
+
+    def invalidate(self, predicate):
+
+        # Drops every entry whose cached value matches, e.g. results that
+        # point into a folder that was just deleted.
+        with self.lock:
+
+            stale = [key for key, (_, value) in self.entries.items() if predicate(value)]
+
+            for key in stale:
+                del self.entries[key]
+
+            return len(stale)
+
+    def stats(self):
+
+        with self.lock:
+            return {
+                "entries": len(self.entries),
+                "max_entries": self.max_entries,
+                "ttl_seconds": self.ttl,
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions
+            }
@@ -0,0 +1,192 @@
+import io
+import zipfile
+
+# ==========================================
+# SINGLE-FILE RUN ARCHIVE
+# ==========================================
+#
+# A run can be stored as one zip (ARCHIVE_NAME) holding all its artifacts
+# under their usual relative paths. Members are compressed one by one and
+# the zip's central directory is the member index, so one member (or a
+# byte range of one) can be served by reading only the directory and that
+# member's bytes from storage: open_archive works over a storage reader
+# (storage.open_reader) that fetches byte ranges on demand.
+
+ARCHIVE_NAME = "run.zip"
+
+# Already compressed formats are stored as they are.
+STORED_SUFFIXES = (".xlsx", ".parquet")
+
+# Smallest range fetched from storage per read, and the size of the
+# chunks streamed back to clients.
+READ_BLOCK = 256 * 1024
+STREAM_CHUNK = 64 * 1024
+
+
+def pack_run(artifacts):
+
+    # {relative path: bytes} -> zip bytes
+    buffer = io.BytesIO()
+
+    with zipfile.ZipFile(buffer, "w") as archive:
+        for relative_path, content in artifacts.items():
+            compression = zipfile.ZIP_STORED if relative_path.endswith(STORED_SUFFIXES) else zipfile.ZIP_DEFLATED
+            archive.writestr(relative_path, content, compress_type=compression)
+
+    return buffer.getvalue()
+
+
+class RangeFile(io.RawIOBase):
+
+    # Read-only, seekable file over a storage reader (.size and
+    # .read(start, length)). Only the ranges asked for are fetched, at
+    # least READ_BLOCK bytes at a time.
+
+    def __init__(self, reader, block=READ_BLOCK):
+        self.reader = reader
+        self.size = reader.size
+        self.block = block
+        self.position = 0
+        self.cache_start = 0
+        self.cache = b""
+
+    def readable(self):
+        return True
+
+    def seekable(self):
+        return True
+
+    def tell(self):
+        return self.position
+
+    def seek(self, offset, whence=io.SEEK_SET):
+
+        base = {io.SEEK_SET: 0, io.SEEK_CUR: self.position, io.SEEK_END: self.size}[whence]
+        self.position = max(base + offset, 0)
+
+        return self.position
+
+    def readinto(self, buffer):
+
+        want = min(len(buffer), self.size - self.position)
+
+        if want <= 0:
+            return 0
+
+        offset = self.position - self.cache_start
+
+        # Reads are always filled: zipfile treats a short read as a
+        # truncated archive.
+        if offset < 0 or offset + want > len(self.cache):
+            # A block near the end starts early, so the end record and the
+            # directory before it come in one request.
+            start = max(min(self.position, self.size - self.block), 0)
+            end = min(max(self.position + want, start + self.block), self.size)
+            self.cache = self.reader.read(start, end - start)
+            self.cache_start = start
+            offset = self.position - start
+
+        data = self.cache[offset:offset + want]
+        buffer[:len(data)] = data
+        self.position += len(data)
+
+        return len(data)
+
+
+def open_archive(reader):
+    return zipfile.ZipFile(RangeFile(reader))
+
+
+def archive_index(archive):
+    return [
+        {
+            "name": info.filename,
+            "size": info.file_size,
+            "compressed_size": info.compress_size,
+            "offset": info.header_offset,
+            "crc32": f"{info.CRC:08x}",
+            "compression": "stored" if info.compress_type == zipfile.ZIP_STORED else "deflate"
+        }
+        for info in archive.infolist()
+    ]
+
+
+def member_size(archive, name):
+
+    # None when the archive has no such member.
+    try:
+        return archive.getinfo(name).file_size
+    except KeyError:
+        return None
+
+
+def read_member(archive, name):
+
+    if member_size(archive, name) is None:
+        return None
+
+    return archive.read(name)
+
+
+def iter_member(archive, name, start=0, end=None):
+
+    # Uncompressed bytes [start, end) of one member, in chunks. Deflated
+    # members are decompressed as they stream; nothing past end is read.
+    with archive.open(name) as member:
+
+        if start:
+            member.seek(start)
+
+        remaining = (end if end is not None else member_size(archive, name)) - start
+
+        while remaining > 0:
+            chunk = member.read(min(STREAM_CHUNK, remaining))
+            if not chunk:
+                break
+            remaining -= len(chunk)
+            yield chunk
+
+
+def iter_range(reader, start, end):
+
+    # Raw stored bytes [start, end), in chunks.
+    position = start
+
+    while position < end:
+        chunk = reader.read(position, min(STREAM_CHUNK, end - position))
+        if not chunk:
+            break
+        position += len(chunk)
+        yield chunk
+
+
+def parse_range(header, size):
+
+    # A single "bytes=start-end" / "bytes=start-" / "bytes=-suffix" range
+    # -> (start, end) with end exclusive, or None for the whole file.
+    # Raises ValueError when it cannot be satisfied.
+    if not header:
+        return None
+
+    unit, _, spec = header.partition("=")
+
+    if unit.strip() != "bytes" or "," in spec:
+        return None
+
+    first, _, last = spec.strip().partition("-")
+
+    if not first:
+        if not last.isdigit() or not int(last):
+            raise ValueError(f"Unsatisfiable range: {header}")
+        return max(size - int(last), 0), size
+
+    if not first.isdigit() or (last and not last.isdigit()):
+        return None
+
+    start = int(first)
+    end = min(int(last) + 1, size) if last else size
+
+    if start >= size or end <= start:
+        raise ValueError(f"Unsatisfiable range: {header}")
+
+    return start, end
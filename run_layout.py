@@ -0,0 +1,27 @@
+# ==========================================
+# RUN FOLDER LAYOUT
+# ==========================================
+#
+# Paths of the artifacts inside a validation_<timestamp> folder and the
+# selectable output formats. Kept apart from validator so code that only
+# names files (listing, responses) does not load pandas.
+
+MATCHED_EXCEL = "valid/matched_signals.xlsx"
+MATCHED_JSON = "valid/matched_signals.json"
+MATCHED_PARQUET = "valid/matched_signals.parquet"
+CE_UNMATCHED_EXCEL = "not_valid/ce_unmatched.xlsx"
+CE_UNMATCHED_PARQUET = "not_valid/ce_unmatched.parquet"
+PE_UNMATCHED_EXCEL = "not_valid/pe_unmatched.xlsx"
+PE_UNMATCHED_PARQUET = "not_valid/pe_unmatched.parquet"
+META_JSON = "validation_meta.json"
+STATE_JSON = "validation_state.json"
+SUMMARY_EXCEL = "summary.xlsx"
+
+# Written next to the other artifacts for profiled requests.
+PROFILE_STACKS = "profile/stacks.collapsed"
+PROFILE_TOP = "profile/top_functions.json"
+
+# validation_meta.json is always written, validation_state.json for
+# incremental runs; these pick the other artifacts.
+OUTPUT_FORMATS = ("excel", "json", "parquet")
+DEFAULT_FORMATS = ("excel", "json")
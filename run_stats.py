@@ -0,0 +1,97 @@
+# ==========================================
+# CROSS-RUN STATISTICS
+# ==========================================
+#
+# Aggregates over the run entries in the manifest. They are updated
+# incrementally as runs are added or removed and stored next to the runs,
+# so reading them never walks every run.
+
+TREND_LENGTH = 200
+
+
+def empty_stats():
+    return {
+        "run_count": 0,
+        "total_ce_entries": 0,
+        "total_pe_entries": 0,
+        "total_index_entries": 0,
+        "total_valid_matches": 0,
+        "overall_match_percentage": 0,
+        "symbol_coverage": {},
+        "trend": []
+    }
+
+
+def trend_point(run):
+    return {
+        "folder": run["folder"],
+        "timestamp": run["timestamp"],
+        "match_percentage": run.get("match_percentage"),
+        "total_ce_entries": run.get("total_ce_entries"),
+        "total_valid_matches": run.get("total_valid_matches")
+    }
+
+
+def apply_run(stats, run, sign=1):
+
+    stats["run_count"] += sign
+
+    for field in ("total_ce_entries", "total_pe_entries", "total_index_entries", "total_valid_matches"):
+        stats[field] += sign * (run.get(field) or 0)
+
+    coverage = stats["symbol_coverage"]
+
+    for symbol in run.get("symbols", []):
+        coverage[symbol] = coverage.get(symbol, 0) + sign
+        if coverage[symbol] <= 0:
+            del coverage[symbol]
+
+    # Trend points are kept oldest first and capped at TREND_LENGTH.
+    trend = [point for point in stats["trend"] if point["folder"] != run["folder"]]
+
+    if sign > 0 and run.get("match_percentage") is not None:
+        trend.append(trend_point(run))
+        trend.sort(key=lambda point: point["timestamp"])
+
+    stats["trend"] = trend[-TREND_LENGTH:]
+
+    stats["overall_match_percentage"] = (
+        round(stats["total_valid_matches"] / stats["total_ce_entries"] * 100, 2)
+        if stats["total_ce_entries"] else 0
+    )
+
+    return stats
+
+
+def build_stats(runs):
+    stats = empty_stats()
+    for run in runs:
+        apply_run(stats, run)
+    return stats
+
+
+def update_stats(stats, old_runs, new_runs):
+
+    # Applies only the difference between two manifest run lists.
+    old = {run["folder"]: run for run in old_runs}
+    new = {run["folder"]: run for run in new_runs}
+
+    for folder, run in old.items():
+        if folder not in new or new[folder] != run:
+            apply_run(stats, run, -1)
+
+    for folder, run in new.items():
+        if folder not in old or old[folder] != run:
+            apply_run(stats, run, 1)
+
+    # A removed run may have held a trend slot while older runs were cut
+    # off; refill from the runs themselves when the trend runs short.
+    eligible = [run for run in new_runs if run.get("match_percentage") is not None]
+
+    if len(stats["trend"]) < min(TREND_LENGTH, len(eligible)):
+        stats["trend"] = sorted(
+            (trend_point(run) for run in eligible),
+            key=lambda point: point["timestamp"]
+        )[-TREND_LENGTH:]
+
+    return stats
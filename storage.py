@@ -0,0 +1,508 @@
+import os
+import json
+import shutil
+import asyncio
+import tempfile
+import threading
+from datetime import datetime, timedelta
+from contextlib import contextmanager
+
+try:
+    import fcntl
+except ImportError:  # Windows
+    fcntl = None
+
+# renameat2(RENAME_EXCHANGE) swaps two folders in one step (Linux).
+try:
+    import ctypes
+    renameat2 = ctypes.CDLL(None, use_errno=True).renameat2
+except (ImportError, OSError, AttributeError):
+    renameat2 = None
+
+AT_FDCWD = -100
+RENAME_EXCHANGE = 2
+
+from github_uploader import (
+    BRANCH,
+    RAW_URL,
+    upload_artifacts_to_github,
+    upload_artifacts_to_github_async,
+    upload_runs_to_github,
+    delete_folder_single_commit,
+    get_branch_head,
+    read_file,
+    read_file_range,
+    file_size,
+    RunNotFoundError
+)
+from manifest import (
+    BASE_PATH,
+    MANIFEST_PATH,
+    manifest_hook,
+    load_manifest,
+    apply_change,
+    manifest_from_runs,
+    runs_from_folders
+)
+
+# ==========================================
+# BYTE-RANGE READERS
+# ==========================================
+
+class GitHubReader:
+
+    # Pinned to the commit that was head when opened, so a later upload
+    # cannot change the file between two reads.
+    def __init__(self, repo, token, path, ref, size):
+        self.repo = repo
+        self.token = token
+        self.path = path
+        self.ref = ref
+        self.size = size
+
+    def read(self, start, length):
+        return read_file_range(self.repo, self.token, self.path, start, length, self.ref)
+
+    def close(self):
+        pass
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+class LocalReader:
+
+    # Holds the file open: a run replaced meanwhile is renamed aside, and
+    # the open handle keeps reading the version it started with.
+    def __init__(self, path):
+        self.file = open(path, "rb")
+        self.size = os.fstat(self.file.fileno()).st_size
+
+    def read(self, start, length):
+        self.file.seek(start)
+        return self.file.read(length)
+
+    def close(self):
+        self.file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+# ==========================================
+# ARTIFACT STORAGE BACKENDS
+# ==========================================
+#
+# Everything app.py stores goes through one of these. Paths are always
+# repo-style ("validation_results/validation_<timestamp>/valid/..."), and
+# every write also applies a manifest change (manifest.add_run /
+# remove_runs) so the run listing stays in step with the stored folders:
+#
+#   upload(artifacts, change, timestamp=None)
+#       -> {"files": [paths], "timestamp": ..., "manifest": {...}}
+#       with a timestamp, overwrites those files of that existing run;
+#       its other files (e.g. an attached profile) stay
+#   upload_async(...)    same, awaited on an event loop
+#   upload_batch([artifacts, ...], change)
+#       several new runs in one write; change(runs, timestamps)
+#       -> {"runs": [{"files": [...], "timestamp": ...}], "manifest": {...}}
+#   attach(timestamp, files)
+#       adds files to an existing run, manifest untouched
+#       -> {"files": [paths], "timestamp": ...}
+#   upload with a timestamp and attach raise RunNotFoundError when the
+#   run folder does not exist.
+#   delete(folder_path, change)
+#       -> {"deleted_files": n, "deleted_folders": n, "manifest": {...}}
+#   read(path)           -> bytes, or None when missing
+#   open_reader(path)    -> reader with .size, .read(start, length) and
+#                           .close() for byte-range reads, or None
+#   load_manifest()      -> {"runs": [...], "stats": {...}}
+#   file_url(path) / folder_url(path)
+
+
+class GitHubStorage:
+
+    name = "github"
+
+    def __init__(self, repo, token):
+        self.repo = repo
+        self.token = token
+        self.location = repo
+
+    def upload(self, artifacts, change, timestamp=None):
+
+        result = {}
+
+        files, timestamp = upload_artifacts_to_github(
+            artifacts=artifacts,
+            repo=self.repo,
+            token=self.token,
+            extra_entries=manifest_hook(self.repo, self.token, change, result),
+            timestamp=timestamp
+        )
+
+        return {"files": files, "timestamp": timestamp, **result}
+
+    async def upload_async(self, artifacts, change, timestamp=None):
+
+        result = {}
+
+        files, timestamp = await upload_artifacts_to_github_async(
+            artifacts=artifacts,
+            repo=self.repo,
+            token=self.token,
+            extra_entries=manifest_hook(self.repo, self.token, change, result),
+            timestamp=timestamp
+        )
+
+        return {"files": files, "timestamp": timestamp, **result}
+
+    def upload_batch(self, runs, change):
+
+        result = {}
+
+        uploaded = upload_runs_to_github(
+            runs=runs,
+            repo=self.repo,
+            token=self.token,
+            extra_entries=manifest_hook(self.repo, self.token, change, result)
+        )
+
+        return {
+            "runs": [{"files": files, "timestamp": timestamp} for files, timestamp in uploaded],
+            **result
+        }
+
+    def attach(self, timestamp, files):
+
+        # Overwrites those paths in place; the run's other files stay.
+        paths, timestamp = upload_artifacts_to_github(
+            artifacts=files,
+            repo=self.repo,
+            token=self.token,
+            timestamp=timestamp
+        )
+
+        return {"files": paths, "timestamp": timestamp}
+
+    def delete(self, folder_path, change):
+
+        result = {}
+
+        deleted = delete_folder_single_commit(
+            repo=self.repo,
+            token=self.token,
+            folder_path=folder_path,
+            extra_entries=manifest_hook(self.repo, self.token, change, result)
+        )
+
+        return {**deleted, **result}
+
+    def read(self, path):
+        return read_file(self.repo, self.token, path)
+
+    def open_reader(self, path):
+
+        commit_sha, _ = get_branch_head(self.repo, self.token)
+        size = file_size(self.repo, self.token, path, ref=commit_sha)
+
+        if size is None:
+            return None
+
+        return GitHubReader(self.repo, self.token, path, commit_sha, size)
+
+    def load_manifest(self):
+        return load_manifest(self.repo, self.token)
+
+    def file_url(self, path):
+        return f"{RAW_URL}/{self.repo}/{BRANCH}/{path}"
+
+    def folder_url(self, path):
+        return f"https://github.com/{self.repo}/tree/{BRANCH}/{path}"
+
+
+class LocalStorage:
+
+    # Runs live under root/validation_results like in the GitHub repo, with
+    # the manifest next to them. A run is written into a scratch folder
+    # and renamed into place, so readers never see a half-written run; a
+    # replaced run is swapped with its new folder (see swap_in), so it is
+    # never missing either.
+    # Writes are serialised by a lock file (and a thread lock), which also
+    # covers several worker processes sharing the directory.
+    name = "local"
+
+    def __init__(self, root):
+        self.root = os.path.abspath(root)
+        self.location = self.root
+        self.scratch = os.path.join(self.root, ".tmp")
+        self.lock = threading.Lock()
+
+        os.makedirs(os.path.join(self.root, BASE_PATH), exist_ok=True)
+        os.makedirs(self.scratch, exist_ok=True)
+
+    def local_path(self, path):
+
+        full = os.path.abspath(os.path.join(self.root, *path.strip("/").split("/")))
+
+        if os.path.commonpath([full, self.root]) != self.root:
+            raise ValueError(f"Path outside storage: {path}")
+
+        return full
+
+    @contextmanager
+    def locked(self):
+        with self.lock:
+            with open(os.path.join(self.root, ".lock"), "a") as lock_file:
+                if fcntl:
+                    fcntl.flock(lock_file, fcntl.LOCK_EX)
+                yield
+
+    def write_manifest(self, manifest):
+
+        fd, tmp_path = tempfile.mkstemp(dir=self.scratch, suffix=".json")
+
+        with os.fdopen(fd, "w") as f:
+            json.dump(manifest, f, indent=1)
+
+        os.replace(tmp_path, self.local_path(MANIFEST_PATH))
+
+    def read_manifest(self):
+
+        content = self.read(MANIFEST_PATH)
+
+        if content is not None:
+            return json.loads(content)
+
+        # First use of an existing directory: list the run folders once.
+        return manifest_from_runs(runs_from_folders(os.listdir(self.local_path(BASE_PATH))))
+
+    def discard(self, path):
+
+        # Renamed aside first, so the folder disappears in one step.
+        trash = tempfile.mkdtemp(dir=self.scratch, prefix="trash_")
+        os.rename(path, os.path.join(trash, "folder"))
+        shutil.rmtree(trash)
+
+    def carry_over(self, target, staging, artifacts):
+
+        # Files of the stored run that the new upload does not replace go
+        # into staging too, so they survive the swap as they do on GitHub.
+        for folder, _, files in os.walk(target):
+            for name in files:
+                path = os.path.join(folder, name)
+                relative_path = os.path.relpath(path, target).replace(os.sep, "/")
+
+                if relative_path not in artifacts:
+                    copy = os.path.join(staging, *relative_path.split("/"))
+                    os.makedirs(os.path.dirname(copy), exist_ok=True)
+                    shutil.copy2(path, copy)
+
+    def swap_in(self, staging, target):
+
+        # Exchanges the two folders in one step where the system can; the
+        # old run then sits in staging. Elsewhere the old run is renamed
+        # aside right before the new one is renamed in.
+        if renameat2 is not None and renameat2(
+            AT_FDCWD, os.fsencode(staging), AT_FDCWD, os.fsencode(target), RENAME_EXCHANGE
+        ) == 0:
+            shutil.rmtree(staging)
+            return
+
+        trash = tempfile.mkdtemp(dir=self.scratch, prefix="trash_")
+        os.rename(target, os.path.join(trash, "folder"))
+        os.rename(staging, target)
+        shutil.rmtree(trash)
+
+    def next_timestamp(self, taken=()):
+
+        # A run already holds this second; take the next free one.
+        moment = datetime.now()
+        timestamp = moment.strftime("%Y%m%d_%H%M%S")
+
+        while timestamp in taken or os.path.exists(self.local_path(f"{BASE_PATH}/validation_{timestamp}")):
+            moment += timedelta(seconds=1)
+            timestamp = moment.strftime("%Y%m%d_%H%M%S")
+
+        return timestamp
+
+    def stage(self, artifacts, timestamp):
+
+        staging = tempfile.mkdtemp(dir=self.scratch, prefix=f"validation_{timestamp}_")
+
+        for relative_path, content in artifacts.items():
+
+            path = os.path.join(staging, *relative_path.split("/"))
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+
+            with open(path, "wb") as f:
+                f.write(content)
+
+        return staging
+
+    def upload(self, artifacts, change, timestamp=None):
+
+        replace = timestamp is not None
+
+        with self.locked():
+
+            if not replace:
+                timestamp = self.next_timestamp()
+
+            folder_path = f"{BASE_PATH}/validation_{timestamp}"
+            target = self.local_path(folder_path)
+
+            if replace and not os.path.isdir(target):
+                raise RunNotFoundError(f"No run folder {folder_path}")
+
+            staging = self.stage(artifacts, timestamp)
+
+            if replace:
+                self.carry_over(target, staging, artifacts)
+                self.swap_in(staging, target)
+            else:
+                os.rename(staging, target)
+
+            manifest = apply_change(self.read_manifest(), change, timestamp)
+            self.write_manifest(manifest)
+
+        return {
+            "files": [f"{folder_path}/{relative_path}" for relative_path in artifacts],
+            "timestamp": timestamp,
+            "manifest": manifest
+        }
+
+    def upload_batch(self, runs, change):
+
+        with self.locked():
+
+            timestamps = []
+            for _ in runs:
+                timestamps.append(self.next_timestamp(timestamps))
+
+            # Everything is staged before the first run is moved into place.
+            stagings = [self.stage(artifacts, timestamp) for artifacts, timestamp in zip(runs, timestamps)]
+
+            for staging, timestamp in zip(stagings, timestamps):
+                os.rename(staging, self.local_path(f"{BASE_PATH}/validation_{timestamp}"))
+
+            manifest = apply_change(self.read_manifest(), change, timestamps)
+            self.write_manifest(manifest)
+
+        return {
+            "runs": [
+                {
+                    "files": [f"{BASE_PATH}/validation_{timestamp}/{relative_path}" for relative_path in artifacts],
+                    "timestamp": timestamp
+                }
+                for artifacts, timestamp in zip(runs, timestamps)
+            ],
+            "manifest": manifest
+        }
+
+    async def upload_async(self, artifacts, change, timestamp=None):
+        # Local disk writes; the lock file wait must not stall the loop.
+        return await asyncio.to_thread(self.upload, artifacts, change, timestamp)
+
+    def attach(self, timestamp, files):
+
+        folder_path = f"{BASE_PATH}/validation_{timestamp}"
+
+        with self.locked():
+
+            target = self.local_path(folder_path)
+
+            if not os.path.isdir(target):
+                raise RunNotFoundError(f"No run folder {folder_path}")
+
+            # Each file is renamed into place whole.
+            staging = self.stage(files, timestamp)
+
+            for relative_path in files:
+                path = os.path.join(target, *relative_path.split("/"))
+                os.makedirs(os.path.dirname(path), exist_ok=True)
+                os.replace(os.path.join(staging, *relative_path.split("/")), path)
+
+            shutil.rmtree(staging)
+
+        return {
+            "files": [f"{folder_path}/{relative_path}" for relative_path in files],
+            "timestamp": timestamp
+        }
+
+    def delete(self, folder_path, change):
+
+        with self.locked():
+
+            target = self.local_path(folder_path)
+
+            # Deleting BASE_PATH removes every run but keeps the folder.
+            if folder_path.rstrip("/") == BASE_PATH:
+                targets = [os.path.join(target, name) for name in os.listdir(target)]
+            else:
+                targets = [target] if os.path.isdir(target) else []
+
+            deleted_files = 0
+            deleted_folders = 0
+
+            for path in targets:
+                for _, dirs, files in os.walk(path):
+                    deleted_files += len(files)
+                    deleted_folders += len(dirs)
+
+                # Folders inside folder_path, as GitHub counts them: the run
+                # folders of BASE_PATH, but not a deleted run's own folder.
+                if path != target:
+                    deleted_folders += 1
+
+                self.discard(path)
+
+            manifest = apply_change(self.read_manifest(), change)
+            self.write_manifest(manifest)
+
+        return {
+            "deleted_files": deleted_files,
+            "deleted_folders": deleted_folders,
+            "manifest": manifest
+        }
+
+    def read(self, path):
+
+        try:
+            with open(self.local_path(path), "rb") as f:
+                return f.read()
+        except FileNotFoundError:
+            return None
+
+    def open_reader(self, path):
+
+        try:
+            return LocalReader(self.local_path(path))
+        except (FileNotFoundError, IsADirectoryError):
+            return None
+
+    def load_manifest(self):
+        return self.read_manifest()
+
+    def file_url(self, path):
+        return "file://" + self.local_path(path)
+
+    def folder_url(self, path):
+        return "file://" + self.local_path(path)
+
+
+def create_storage(backend, repo=None, token=None, local_root=None):
+
+    if backend == "github":
+        return GitHubStorage(repo, token)
+
+    if backend == "local":
+        return LocalStorage(local_root)
+
+    raise ValueError(f"Unknown storage backend: {backend}")
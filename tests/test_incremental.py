@@ -0,0 +1,62 @@
+import json
+
+import pandas as pd
+import pytest
+
+from run_layout import META_JSON, STATE_JSON
+from utils.synthetic_trades import generate_trades
+from validator import (
+    build_incremental_artifacts,
+    build_validation_artifacts,
+    extract_entry_times,
+    table_from_state
+)
+
+TABLES = ("matched", "ce_unmatched", "pe_unmatched")
+TOTALS = ("total_ce_entries", "total_pe_entries", "total_index_entries", "total_valid_matches")
+
+
+def in_time_order(records):
+
+    # An export holds every trade up to its cut, in time order.
+    times = extract_entry_times(pd.DataFrame(records)['dateTime'])
+
+    return [records[i] for i in times.argsort(kind="stable")]
+
+
+def run_tables(artifacts):
+
+    state = json.loads(artifacts[STATE_JSON])
+    meta = json.loads(artifacts[META_JSON])
+
+    return {name: table_from_state(state[name]) for name in TABLES}, {key: meta[key] for key in TOTALS}
+
+
+@pytest.mark.parametrize("seed", [0, 5])
+@pytest.mark.parametrize("fraction", [0.3, 0.77])
+@pytest.mark.parametrize("full_history", [True, False])
+def test_append_matches_full_run_on_tied_timestamps(seed, fraction, full_history):
+
+    # cluster_size=4 puts several trades on the same minute, so the cut
+    # splits a minute between the stored run and the append.
+    legs = [in_time_order(records) for records in generate_trades(600, cluster_size=4, seed=seed)]
+    cuts = [int(len(records) * fraction) + 1 for records in legs]
+
+    full_tables, full_totals = run_tables(
+        build_validation_artifacts(*legs, formats=("json",), incremental=True)
+    )
+
+    base = build_validation_artifacts(
+        *[records[:cut] for records, cut in zip(legs, cuts)],
+        formats=("json",), incremental=True
+    )
+    appended = legs if full_history else [records[cut:] for records, cut in zip(legs, cuts)]
+
+    tables, totals = run_tables(
+        build_incremental_artifacts(json.loads(base[STATE_JSON]), *appended)
+    )
+
+    assert totals == full_totals
+
+    for name in TABLES:
+        pd.testing.assert_frame_equal(tables[name], full_tables[name].reset_index(drop=True))
@@ -0,0 +1,149 @@
+import pandas as pd
+import pytest
+
+from utils.synthetic_trades import generate_trades
+from validator import (
+    MATCH_TOLERANCE,
+    TIME_FORMAT,
+    match_signals,
+    match_signals_chunked,
+    match_signals_sharded,
+    pe_unmatched_table,
+    prepare_trades,
+    prepare_trades_lean
+)
+
+# CE signal -> (PE signal, INDEX signal, confirmation type)
+RULES = {
+    "BUY": ("SELL", "BUY", "CE Bullish Confirmed"),
+    "SELL": ("BUY", "SELL", "CE Bearish Confirmed")
+}
+
+
+def leg_fields(name, row, signal):
+    return {
+        f"{name} Symbol": row.get('symbol'),
+        f"{name} TradeNo": row.get('tradeNo'),
+        f"{name} Signal": signal,
+        f"{name} Time": row['entry_time'].strftime(TIME_FORMAT)
+    }
+
+
+def reference_match(df_ce, df_pe, df_index):
+
+    # The per-row scan the vectorized engine replaced: every CE row takes
+    # the first PE and INDEX row, in sorted order, carrying the required
+    # signal within the tolerance.
+    matched = []
+    ce_unmatched = []
+    pe_used = set()
+
+    for _, ce in df_ce.iterrows():
+
+        if ce['entry_signal'] not in RULES:
+            continue
+
+        pe_signal, index_signal, confirmation_type = RULES[ce['entry_signal']]
+
+        pe_candidates = df_pe[
+            (df_pe['entry_signal'] == pe_signal) &
+            ((df_pe['entry_time'] - ce['entry_time']).abs() <= MATCH_TOLERANCE)
+        ]
+        index_candidates = df_index[
+            (df_index['entry_signal'] == index_signal) &
+            ((df_index['entry_time'] - ce['entry_time']).abs() <= MATCH_TOLERANCE)
+        ]
+
+        if not pe_candidates.empty and not index_candidates.empty:
+
+            pe = pe_candidates.iloc[0]
+            pe_used.add(pe.name)
+
+            matched.append({
+                **leg_fields("CE", ce, ce['entry_signal']),
+                **leg_fields("PE", pe, pe_signal),
+                **leg_fields("INDEX", index_candidates.iloc[0], index_signal),
+                "Confirmation Type": confirmation_type,
+                "Status": "VALID"
+            })
+
+        else:
+            ce_unmatched.append({
+                "CE Symbol": ce.get('symbol'),
+                "CE TradeNo": ce.get('tradeNo'),
+                "Signal": ce['entry_signal'],
+                "Time": ce['entry_time'].strftime(TIME_FORMAT),
+                "Reason": "PE or INDEX confirmation missing"
+            })
+
+    return pd.DataFrame(matched), pd.DataFrame(ce_unmatched), pe_used
+
+
+def tables(df_pe, result):
+    matched_df, ce_unmatched, pe_used = result
+    return matched_df, ce_unmatched, pe_unmatched_table(df_pe, pe_used)
+
+
+def assert_tables_equal(actual, expected):
+
+    # Lean frames downcast tradeNo and keep text as categoricals; the rows
+    # and values must still be the same.
+    for got, want in zip(actual, expected):
+        pd.testing.assert_frame_equal(
+            got.reset_index(drop=True).astype(object),
+            want.reset_index(drop=True).astype(object)
+        )
+
+
+@pytest.fixture(scope="module", params=[(0, 1), (3, 3), (7, 6)], ids=["spread", "ties", "dense-ties"])
+def trades(request):
+
+    # cluster_size > 1 packs several trades of each leg onto the same
+    # minute, so the first-candidate choice among ties is exercised.
+    seed, cluster_size = request.param
+    ce, pe, ix = generate_trades(400, cluster_size=cluster_size, seed=seed)
+
+    frames = [prepare_trades(pd.DataFrame(records)) for records in (ce, pe, ix)]
+    expected = tables(frames[1], reference_match(*frames))
+
+    return (ce, pe, ix), frames, expected
+
+
+def test_reference_sees_ties_and_misses(trades):
+    _, (df_ce, _, _), (matched_df, ce_unmatched, pe_unmatched) = trades
+
+    assert len(matched_df) and len(ce_unmatched) and len(pe_unmatched)
+    if df_ce['entry_time'].duplicated().any():
+        assert matched_df['CE Time'].duplicated().any()
+
+
+def test_serial_matches_reference(trades):
+    _, frames, expected = trades
+
+    assert_tables_equal(tables(frames[1], match_signals(*frames)), expected)
+
+
+@pytest.mark.parametrize("chunk_rows", [None, 37])
+def test_lean_matches_reference(trades, chunk_rows):
+    records, _, expected = trades
+
+    frames = [prepare_trades_lean(data, chunk_rows) for data in records]
+
+    assert_tables_equal(tables(frames[1], match_signals(*frames)), expected)
+    assert_tables_equal(tables(frames[1], match_signals_chunked(*frames, 5)), expected)
+
+
+@pytest.mark.parametrize("window", ["1h", "15min"])
+def test_sharded_matches_reference(trades, window):
+    _, frames, expected = trades
+
+    result = match_signals_sharded(*frames, processes=2, window=window)
+
+    assert_tables_equal(tables(frames[1], result), expected)
+
+
+@pytest.mark.parametrize("chunks", [2, 9])
+def test_chunked_matches_reference(trades, chunks):
+    _, frames, expected = trades
+
+    assert_tables_equal(tables(frames[1], match_signals_chunked(*frames, chunks)), expected)
@@ -1,20 +1,241 @@
+import os
+import json
+import asyncio
+import hashlib
+import tempfile
+import functools
 import requests
+from requests.adapters import HTTPAdapter
+from concurrent.futures import ThreadPoolExecutor
+
+# ==========================================
+# SHARED POOLED SESSION + CONDITIONAL CACHE
+# ==========================================
+
+FETCH_TIMEOUT = 15
+FETCH_CACHE_DIR = os.getenv("FETCH_CACHE_DIR", os.path.join(tempfile.gettempdir(), "trade_fetch_cache"))
+POOL_SIZE = 10
+
+
+def create_session(pool_size: int = POOL_SIZE):
+    session = requests.Session()
+    adapter = HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size)
+    session.mount("https://", adapter)
+    session.mount("http://", adapter)
+    return session
+
+
+SESSION = create_session()
+
+
+def cache_paths(url: str, cache_dir: str):
+    key = hashlib.sha256(url.encode()).hexdigest()
+    return (
+        os.path.join(cache_dir, f"{key}.body"),
+        os.path.join(cache_dir, f"{key}.meta.json")
+    )
+
+
+def read_cache(url: str, cache_dir: str):
+    body_path, meta_path = cache_paths(url, cache_dir)
+
+    try:
+        with open(meta_path) as f:
+            meta = json.load(f)
+        with open(body_path, "rb") as f:
+            return meta, f.read()
+    except (OSError, ValueError):
+        return None, None
+
+
+def write_cache(url: str, cache_dir: str, headers, body: bytes):
+    validators = {
+        "etag": headers.get("ETag"),
+        "last_modified": headers.get("Last-Modified")
+    }
+
+    # Nothing to revalidate against, so nothing worth keeping.
+    if not validators["etag"] and not validators["last_modified"]:
+        return
+
+    body_path, meta_path = cache_paths(url, cache_dir)
+
+    try:
+        os.makedirs(cache_dir, exist_ok=True)
+
+        # Write-then-rename so concurrent fetches never see half a file.
+        for path, data in ((body_path, body), (meta_path, json.dumps(validators).encode())):
+            fd, tmp_path = tempfile.mkstemp(dir=cache_dir)
+            with os.fdopen(fd, "wb") as f:
+                f.write(data)
+            os.replace(tmp_path, path)
+
+    except OSError:
+        pass
+
+
+def conditional_headers(meta):
+    headers = {}
+
+    if meta:
+        if meta.get("etag"):
+            headers["If-None-Match"] = meta["etag"]
+        if meta.get("last_modified"):
+            headers["If-Modified-Since"] = meta["last_modified"]
+
+    return headers
+
 
 # ==========================================
 # HELPER: FETCH RAW JSON FROM GITHUB
 # ==========================================
-def fetch_github_json(url: str, name: str):
+def fetch_github_json(url: str, name: str, session=None, cache_dir: str = FETCH_CACHE_DIR):
+    session = session or SESSION
+
     try:
-        response = requests.get(url, timeout=15)
+        meta, cached_body = read_cache(url, cache_dir) if cache_dir else (None, None)
+
+        response = session.get(url, headers=conditional_headers(meta), timeout=FETCH_TIMEOUT)
 
-        if response.status_code != 200:
+        if response.status_code == 304 and cached_body is not None:
+            body = cached_body
+
+        elif response.status_code != 200:
             raise Exception(f"{name} URL returned {response.status_code}")
 
+        else:
+            body = response.content
+            if cache_dir:
+                write_cache(url, cache_dir, response.headers, body)
+
         try:
-            return response.json()
+            return json.loads(body)
         except ValueError:
             raise Exception(f"{name} URL does not contain valid JSON")
 
     except requests.exceptions.RequestException as e:
         raise Exception(f"Error fetching {name}: {str(e)}")
 
+
+def fetch_all_json(urls: dict, session=None, cache_dir: str = FETCH_CACHE_DIR):
+    # urls: {name: url}. Fetches run concurrently over the shared session;
+    # a URL listed under several names is only downloaded once.
+    unique = {}
+    for name, url in urls.items():
+        unique.setdefault(url, name)
+
+    with ThreadPoolExecutor(max_workers=max(1, len(unique))) as pool:
+        futures = {
+            url: pool.submit(fetch_github_json, url, name, session, cache_dir)
+            for url, name in unique.items()
+        }
+        results = {url: future.result() for url, future in futures.items()}
+
+    return {name: results[url] for name, url in urls.items()}
+
+
+def fetch_each_json(urls, session=None, cache_dir: str = FETCH_CACHE_DIR, max_workers: int = POOL_SIZE):
+    # {url: parsed JSON, or the Exception that URL raised}, so one bad URL
+    # does not fail the others. Each URL is fetched once, at most
+    # max_workers at a time.
+    unique = list(dict.fromkeys(urls))
+
+    def fetch(url):
+        try:
+            return fetch_github_json(url, url, session, cache_dir)
+        except Exception as e:
+            return e
+
+    with ThreadPoolExecutor(max_workers=max(1, min(max_workers, len(unique)))) as pool:
+        return dict(zip(unique, pool.map(fetch, unique)))
+
+
+# ==========================================
+# ASYNC FETCH (EVENT LOOP)
+# ==========================================
+#
+# Same conditional cache and errors as above, but the downloads are awaited
+# on the running event loop instead of holding a thread each. Without
+# aiohttp installed the blocking fetch runs in a thread instead.
+
+ASYNC_POOL_SIZE = int(os.getenv("ASYNC_FETCH_POOL_SIZE", "50"))
+
+async_sessions = {}
+
+
+@functools.lru_cache(maxsize=None)
+def load_aiohttp():
+    # Only the async path needs aiohttp, so it is imported on first use
+    # rather than at startup. None when it is not installed.
+    try:
+        import aiohttp
+    except ImportError:  # async fetches fall back to threads
+        return None
+    return aiohttp
+
+
+def async_session():
+    # One aiohttp session per event loop (the app runs a single loop).
+    loop = asyncio.get_running_loop()
+    aiohttp = load_aiohttp()
+
+    if loop not in async_sessions:
+        async_sessions[loop] = aiohttp.ClientSession(
+            connector=aiohttp.TCPConnector(limit=ASYNC_POOL_SIZE)
+        )
+
+    return async_sessions[loop]
+
+
+async def fetch_github_json_async(url: str, name: str, session=None, cache_dir: str = FETCH_CACHE_DIR):
+    session = session or async_session()
+    aiohttp = load_aiohttp()
+
+    meta, cached_body = read_cache(url, cache_dir) if cache_dir else (None, None)
+
+    try:
+        async with session.get(
+            url,
+            headers=conditional_headers(meta),
+            timeout=aiohttp.ClientTimeout(total=FETCH_TIMEOUT)
+        ) as response:
+            status = response.status
+            headers = response.headers
+            body = await response.read()
+
+    except (aiohttp.ClientError, asyncio.TimeoutError) as e:
+        raise Exception(f"Error fetching {name}: {str(e) or type(e).__name__}")
+
+    if status == 304 and cached_body is not None:
+        body = cached_body
+
+    elif status != 200:
+        raise Exception(f"{name} URL returned {status}")
+
+    elif cache_dir:
+        write_cache(url, cache_dir, headers, body)
+
+    # Large exports take a while to parse; keep the loop free meanwhile.
+    try:
+        return await asyncio.to_thread(json.loads, body)
+    except ValueError:
+        raise Exception(f"{name} URL does not contain valid JSON")
+
+
+async def fetch_all_json_async(urls: dict, session=None, cache_dir: str = FETCH_CACHE_DIR):
+    # urls: {name: url}, fetched concurrently; duplicates are fetched once.
+    if load_aiohttp() is None:
+        return await asyncio.to_thread(fetch_all_json, urls, None, cache_dir)
+
+    unique = {}
+    for name, url in urls.items():
+        unique.setdefault(url, name)
+
+    bodies = await asyncio.gather(*(
+        fetch_github_json_async(url, name, session, cache_dir)
+        for url, name in unique.items()
+    ))
+
+    results = dict(zip(unique, bodies))
+
+    return {name: results[url] for name, url in urls.items()}
@@ -0,0 +1,95 @@
+import numpy as np
+import pandas as pd
+
+# ==========================================
+# SYNTHETIC TRADINGVIEW-STYLE TRADE LISTS
+# ==========================================
+
+SESSION_START = "09:15"
+SESSION_MINUTES = 375          # 09:15 - 15:30
+ENTRY_FORMAT = "%b %d, %Y, %H:%M"
+
+
+def session_times(minute_index: np.ndarray, start_date: str):
+    # Maps a running count of trading minutes onto weekday sessions.
+    days = np.busday_offset(
+        np.datetime64(start_date, "D"),
+        minute_index // SESSION_MINUTES,
+        roll="forward"
+    )
+    open_time = pd.Timedelta(SESSION_START + ":00")
+
+    return (
+        pd.to_datetime(days)
+        + open_time
+        + pd.to_timedelta(minute_index % SESSION_MINUTES, unit="min")
+    )
+
+
+def to_records(times, signals, symbols, exit_after):
+    entry = pd.Series(times)
+    exit_ = entry + pd.to_timedelta(exit_after, unit="min")
+
+    date_time = (exit_.dt.strftime(ENTRY_FORMAT) + "\n" + entry.dt.strftime(ENTRY_FORMAT)).tolist()
+    signal = ["Close\n" + s for s in signals]
+    trade_type = ["Exit Long\nEntry Long" if s == "BUY" else "Exit Short\nEntry Short" for s in signals]
+
+    return [
+        {
+            "tradeNo": i + 1,
+            "symbol": symbol,
+            "type": trade_type[i],
+            "signal": signal[i],
+            "dateTime": date_time[i]
+        }
+        for i, symbol in enumerate(symbols)
+    ]
+
+
+def generate_trades(
+    n: int,
+    match_rate: float = 0.6,
+    cluster_size: int = 1,
+    start_date: str = "2024-01-01",
+    seed: int = 0,
+    ce_symbol: str = "NIFTY24JAN21500CE",
+    pe_symbol: str = "NIFTY24JAN21500PE",
+    index_symbol: str = "NIFTY"
+):
+    # Returns (ce_data, pe_data, index_data), each with n trades in the
+    # exact shape run_validation parses.
+    #   match_rate   share of CE entries given a PE and INDEX confirmation
+    #                inside the 1 minute tolerance (denser clusters add
+    #                some accidental matches on top)
+    #   cluster_size CE entries per signal burst; bigger values pack more
+    #                trades into the same few minutes
+    rng = np.random.default_rng(seed)
+
+    cluster_size = max(1, int(cluster_size))
+
+    # Cluster starts spaced a few minutes apart, members within 2 minutes.
+    n_clusters = -(-n // cluster_size)
+    cluster_minutes = np.cumsum(rng.integers(3, 12, size=n_clusters))
+    ce_minutes = np.repeat(cluster_minutes, cluster_size)[:n] + rng.integers(0, 2, size=n)
+    ce_minutes.sort()
+
+    ce_signals = rng.choice(np.array(["BUY", "SELL"]), size=n)
+    confirmed = rng.random(n) < match_rate
+
+    opposite = np.where(ce_signals == "BUY", "SELL", "BUY")
+
+    # Confirmed rows get the required signal within +-1 minute; the rest
+    # get the wrong signal, so they cannot confirm any nearby CE entry.
+    pe_signals = np.where(confirmed, opposite, ce_signals)
+    index_signals = np.where(confirmed, ce_signals, opposite)
+
+    pe_minutes = np.maximum(ce_minutes + rng.integers(-1, 2, size=n), 0)
+    index_minutes = np.maximum(ce_minutes + rng.integers(-1, 2, size=n), 0)
+
+    exit_after = rng.integers(1, 30, size=n)
+
+    ce_data = to_records(session_times(ce_minutes, start_date), ce_signals, [ce_symbol] * n, exit_after)
+    pe_data = to_records(session_times(pe_minutes, start_date), pe_signals, [pe_symbol] * n, exit_after)
+    index_data = to_records(session_times(index_minutes, start_date), index_signals, [index_symbol] * n, exit_after)
+
+    return ce_data, pe_data, index_data
@@ -1,213 +1,624 @@
+import io
 import os
 import json
+import math
+import tempfile
+import threading
+import multiprocessing
+import numpy as np
 import pandas as pd
 from datetime import datetime
-from openpyxl import load_workbook
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from openpyxl import Workbook
+from openpyxl.cell import WriteOnlyCell
 from openpyxl.styles import Font
 from openpyxl.utils import get_column_letter
 
+from metrics import StageTimer
+from run_layout import (
+    MATCHED_EXCEL,
+    MATCHED_JSON,
+    MATCHED_PARQUET,
+    CE_UNMATCHED_EXCEL,
+    CE_UNMATCHED_PARQUET,
+    PE_UNMATCHED_EXCEL,
+    PE_UNMATCHED_PARQUET,
+    META_JSON,
+    STATE_JSON,
+    SUMMARY_EXCEL,
+    OUTPUT_FORMATS,
+    DEFAULT_FORMATS
+)
+from confirmation_engine import THREE_LEG_CONFIG, TIME_FORMAT, column_values, match_legs, max_tolerance
+
 
 # =====================================================
 # CLEAN FUNCTIONS
 # =====================================================
 
-def extract_entry_time(dt_str):
-    try:
-        entry_line = dt_str.split('\n')[1]
-        return datetime.strptime(entry_line.strip(), "%b %d, %Y, %H:%M")
-    except:
-        return None
+ENTRY_TIME_FORMAT = "%b %d, %Y, %H:%M"
 
 
-def extract_entry_signal(signal_str):
+def extract_second_line(series):
+
+    # TradingView cells hold "<exit>\n<entry>"; rows that are not strings or
+    # have no second line come back as NaN.
     try:
-        return signal_str.split('\n')[1].strip()
-    except:
-        return None
+        return series.str.split('\n', n=2).str[1].str.strip()
+    except AttributeError:
+        return pd.Series(np.nan, index=series.index, dtype=object)
 
 
-def extract_trade_type(type_str):
-    try:
-        return type_str.split('\n')[1].strip()
-    except:
-        return None
+def extract_entry_times(series):
+
+    entry_lines = extract_second_line(series)
+
+    # Exports repeat the same minute many times, so parse each distinct
+    # string once and broadcast the result back to the rows.
+    codes, uniques = pd.factorize(entry_lines)
+    parsed = pd.to_datetime(
+        pd.Series(uniques, dtype=object),
+        format=ENTRY_TIME_FORMAT,
+        errors="coerce"
+    ).to_numpy()
+
+    values = np.full(len(series), np.datetime64("NaT"), dtype=parsed.dtype)
+    known = codes >= 0
+    values[known] = parsed[codes[known]]
+
+    return pd.Series(values, index=series.index)
+
+
+def parse_trade_columns(df):
+
+    df['entry_time'] = extract_entry_times(df['dateTime'])
+    df['entry_signal'] = extract_second_line(df['signal'])
+    df['trade_type'] = extract_second_line(df['type'])
+    df.dropna(subset=['entry_time'], inplace=True)
 
 
 # =====================================================
 # EXCEL SAVE FUNCTION
 # =====================================================
 
-def save_excel(df, path):
+def column_widths(df):
 
-    df.to_excel(path, index=False)
+    # Same widths the cell scan produced: longest non-empty value or
+    # header in each column, plus padding.
+    widths = []
 
-    wb = load_workbook(path)
-    ws = wb.active
+    for position, name in enumerate(df.columns):
+        values = df.iloc[:, position].dropna()
+        values = values[values.astype(bool)]
 
-    ws.freeze_panes = "A2"
+        max_length = len(str(name)) if str(name) else 0
+
+        if len(values):
+            max_length = max(max_length, int(values.astype(str).str.len().max()))
+
+        widths.append(max_length + 3)
+
+    return widths
+
+
+def excel_bytes(df):
+
+    # Writes and styles the sheet in one pass, without reloading the file.
+    buffer = io.BytesIO()
 
-    for column in ws.columns:
-        max_length = 0
-        col_letter = get_column_letter(column[0].column)
+    with pd.ExcelWriter(buffer, engine="openpyxl") as writer:
 
-        for cell in column:
-            if cell.value:
-                max_length = max(max_length, len(str(cell.value)))
+        df.to_excel(writer, index=False)
 
-        ws.column_dimensions[col_letter].width = max_length + 3
+        ws = writer.sheets[next(iter(writer.sheets))]
 
-    for cell in ws[1]:
+        ws.freeze_panes = "A2"
+
+        for position, width in enumerate(column_widths(df), start=1):
+            ws.column_dimensions[get_column_letter(position)].width = width
+
+        for cell in ws[1]:
+            cell.font = Font(bold=True)
+
+    return buffer.getvalue()
+
+
+EXPORT_CHUNK_ROWS = 10000
+
+
+def excel_bytes_streaming(df):
+
+    # Low-memory variant of excel_bytes with the same sheet, widths and
+    # header: a write-only workbook streams the rows out instead of holding
+    # a cell object for every value.
+    wb = Workbook(write_only=True)
+    ws = wb.create_sheet("Sheet1")
+
+    ws.freeze_panes = "A2"
+
+    for position, width in enumerate(column_widths(df), start=1):
+        ws.column_dimensions[get_column_letter(position)].width = width
+
+    header = []
+    for name in df.columns:
+        cell = WriteOnlyCell(ws, value=name)
         cell.font = Font(bold=True)
+        header.append(cell)
+
+    ws.append(header)
+
+    for start in range(0, len(df), EXPORT_CHUNK_ROWS):
+        chunk = df.iloc[start:start + EXPORT_CHUNK_ROWS].astype(object)
+        for row in chunk.where(chunk.notna(), None).itertuples(index=False, name=None):
+            ws.append(row)
+
+    buffer = io.BytesIO()
+    wb.save(buffer)
+
+    return buffer.getvalue()
+
+
+def records_json_bytes(df):
+
+    # Same text as df.to_json(orient="records", indent=4), produced chunk
+    # by chunk so the whole document never exists twice (str and bytes).
+    if df.empty:
+        return b"[]"
+
+    buffer = io.BytesIO()
+    buffer.write(b"[\n")
+
+    for start in range(0, len(df), EXPORT_CHUNK_ROWS):
+        if start:
+            buffer.write(b",\n")
+        text = df.iloc[start:start + EXPORT_CHUNK_ROWS].to_json(orient="records", indent=4)
+        buffer.write(text[2:-2].encode())
 
-    wb.save(path)
+    buffer.write(b"\n]")
+
+    return buffer.getvalue()
+
+
+def save_excel(df, path):
+
+    with open(path, "wb") as f:
+        f.write(excel_bytes(df))
 
 
 # =====================================================
-# MAIN VALIDATION FUNCTION
+# PARQUET EXPORT
 # =====================================================
 
-def run_validation(ce_data, pe_data, index_data):
+def compact_frame(df):
+
+    # Columnar copy for analysis: "dd-mm-YYYY HH:MM:SS" times become int64
+    # epoch seconds, trade numbers the smallest integer type that fits,
+    # and the repeated text columns (symbols, signals, reasons) categoricals.
+    compact = pd.DataFrame(index=pd.RangeIndex(len(df)))
+
+    for name in df.columns:
+        values = df[name].reset_index(drop=True)
+
+        if name == "Time" or name.endswith(" Time"):
+            times = pd.to_datetime(values, format=TIME_FORMAT)
+            compact[name] = times.to_numpy().astype("datetime64[s]").astype(np.int64)
+
+        elif name.endswith("TradeNo"):
+            numbers = pd.to_numeric(values, errors="coerce")
+            if numbers.notna().all():
+                compact[name] = pd.to_numeric(numbers, downcast="integer")
+            else:
+                compact[name] = numbers.astype("Int64")
+
+        else:
+            compact[name] = values.astype("category")
+
+    return compact
+
+
+def parquet_bytes(df):
+
+    buffer = io.BytesIO()
+    compact_frame(df).to_parquet(buffer, index=False, compression="zstd")
+
+    return buffer.getvalue()
+
+
+# =====================================================
+# MATCHING ENGINE
+# =====================================================
+
+# The three-leg CE/PE/INDEX rules are one configuration of the N-leg
+# sweep engine in confirmation_engine.
+MATCH_TOLERANCE = max_tolerance(THREE_LEG_CONFIG)
+
+
+def match_signals(df_ce, df_pe, df_index):
+
+    # All three frames must already be sorted by entry_time. Every CE row
+    # picks the first PE and INDEX row (in that order) carrying the required
+    # signal within the tolerance window, exactly like a per-row scan would.
+    matched_df, ce_unmatched, used = match_legs(
+        {"CE": df_ce, "PE": df_pe, "INDEX": df_index},
+        THREE_LEG_CONFIG
+    )
+
+    return matched_df, ce_unmatched, used["PE"]
+
+
+# =====================================================
+# SHARDED MATCHING (PROCESS POOL)
+# =====================================================
+
+SHARD_WINDOW = "1D"
+SHARDS_PER_PROCESS = 4
+
+# Pools run on the forkserver context: this code runs inside threaded
+# gunicorn workers, and a forked child can inherit a lock another thread
+# was holding. The server imports this module (pandas, numpy) once and
+# every pool worker is forked from it with the imports already done.
+multiprocessing.set_forkserver_preload(["validator"])
+
+# One shard pool per size, started on first use and kept, so requests do
+# not pay for starting processes.
+shard_pools = {}
+shard_pools_lock = threading.Lock()
+
+
+def shard_pool(processes):
+
+    with shard_pools_lock:
+
+        if processes not in shard_pools:
+            shard_pools[processes] = ProcessPoolExecutor(
+                max_workers=processes,
+                mp_context=multiprocessing.get_context("forkserver")
+            )
+
+        return shard_pools[processes]
+
+
+SHARD_COLUMNS = ['symbol', 'tradeNo', 'entry_time', 'entry_signal']
 
-    base_dir = "validation_output"
-    timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
-    base_dir = os.path.join(base_dir, f"validation_{timestamp}")
 
-    valid_dir = os.path.join(base_dir, "valid")
-    not_valid_dir = os.path.join(base_dir, "not_valid")
+def shard_frames(df_ce, df_pe, df_index, window=SHARD_WINDOW, max_shards=None, tolerance=MATCH_TOLERANCE):
 
-    os.makedirs(valid_dir, exist_ok=True)
-    os.makedirs(not_valid_dir, exist_ok=True)
+    # Splits the time-sorted CE rows into contiguous time-window shards and
+    # gives each one the PE/INDEX rows inside its span widened by the
+    # tolerance, so candidates across a shard boundary are never lost.
+    ce_times = df_ce['entry_time']
+    pe_times = df_pe['entry_time'].to_numpy()
+    index_times = df_index['entry_time'].to_numpy()
 
-    df_ce = pd.DataFrame(ce_data)
-    df_pe = pd.DataFrame(pe_data)
-    df_index = pd.DataFrame(index_data)
+    keys = ce_times.dt.floor(window).to_numpy()
+    edges = np.flatnonzero(keys[1:] != keys[:-1]) + 1
 
-    for df in [df_ce, df_pe, df_index]:
-        df['entry_time'] = df['dateTime'].apply(extract_entry_time)
-        df['entry_signal'] = df['signal'].apply(extract_entry_signal)
-        df['trade_type'] = df['type'].apply(extract_trade_type)
-        df.dropna(subset=['entry_time'], inplace=True)
+    # Many small windows cost more in pickling than they save, so adjacent
+    # windows are grouped into at most max_shards shards of similar size.
+    # A window is never split.
+    if max_shards and len(edges) >= max_shards:
+        targets = np.linspace(0, len(df_ce), max_shards + 1)[1:-1]
+        picks = np.searchsorted(edges, targets, side="left")
+        edges = np.unique(edges[np.minimum(picks, len(edges) - 1)])
 
-    df_ce = df_ce[df_ce['trade_type'].str.contains('Entry', na=False)]
-    df_pe = df_pe[df_pe['trade_type'].str.contains('Entry', na=False)]
-    df_index = df_index[df_index['trade_type'].str.contains('Entry', na=False)]
+    starts = np.concatenate(([0], edges))
+    ends = np.concatenate((edges, [len(df_ce)]))
 
-    df_ce = df_ce.sort_values('entry_time')
-    df_pe = df_pe.sort_values('entry_time')
-    df_index = df_index.sort_values('entry_time')
+    ce_cols = [c for c in SHARD_COLUMNS if c in df_ce.columns]
+    pe_cols = [c for c in SHARD_COLUMNS if c in df_pe.columns]
+    index_cols = [c for c in SHARD_COLUMNS if c in df_index.columns]
+
+    shards = []
+
+    for start, end in zip(starts, ends):
+
+        low = ce_times.iloc[start] - tolerance
+        high = ce_times.iloc[end - 1] + tolerance
+
+        pe_slice = slice(
+            np.searchsorted(pe_times, low.to_datetime64(), side="left"),
+            np.searchsorted(pe_times, high.to_datetime64(), side="right")
+        )
+        index_slice = slice(
+            np.searchsorted(index_times, low.to_datetime64(), side="left"),
+            np.searchsorted(index_times, high.to_datetime64(), side="right")
+        )
+
+        shards.append((
+            df_ce[ce_cols].iloc[start:end],
+            df_pe[pe_cols].iloc[pe_slice],
+            df_index[index_cols].iloc[index_slice]
+        ))
+
+    return shards
+
+
+def match_shard(shard):
+    return match_signals(*shard)
+
+
+def match_signals_sharded(df_ce, df_pe, df_index, processes=None, window=SHARD_WINDOW):
+
+    # Same result as match_signals: every CE row only looks at candidates
+    # within the tolerance, shards come back in time order, and the
+    # per-shard frames are concatenated in that order.
+    if df_ce.empty:
+        return match_signals(df_ce, df_pe, df_index)
+
+    processes = processes or os.cpu_count() or 1
+
+    shards = shard_frames(
+        df_ce, df_pe, df_index, window,
+        max_shards=processes * SHARDS_PER_PROCESS
+    )
+
+    if len(shards) == 1 or processes <= 1:
+        return match_signals(df_ce, df_pe, df_index)
+
+    pool = shard_pool(processes)
+
+    try:
+        results = list(pool.map(match_shard, shards))
+
+    except BrokenProcessPool:
+        # A pool process died (e.g. out of memory); the next run gets a
+        # fresh pool instead of failing forever.
+        with shard_pools_lock:
+            if shard_pools.get(processes) is pool:
+                del shard_pools[processes]
+        raise
+
+    return merge_shard_results(results)
+
+
+def merge_shard_results(results):
+
+    matched = [r[0] for r in results if not r[0].empty]
+    ce_unmatched = [r[1] for r in results if not r[1].empty]
+
+    matched_df = pd.concat(matched, ignore_index=True) if matched else pd.DataFrame()
+    ce_unmatched_df = pd.concat(ce_unmatched, ignore_index=True) if ce_unmatched else pd.DataFrame()
 
-    matched = []
-    ce_unmatched = []
     pe_used = set()
+    for r in results:
+        pe_used |= r[2]
 
-    for _, ce in df_ce.iterrows():
+    return matched_df, ce_unmatched_df, pe_used
 
-        ce_time = ce['entry_time']
-        ce_signal = ce['entry_signal']
 
-        if ce_signal == "BUY":
-            required_pe_signal = "SELL"
-            required_index_signal = "BUY"
-            confirmation_type = "CE Bullish Confirmed"
+# =====================================================
+# LOW-MEMORY MODE
+# =====================================================
+#
+# Only the fields validation reads are taken from the input records, the
+# raw two-line strings are dropped as soon as they are parsed, and the
+# repeated text columns become categoricals. When the estimated working
+# set is over the memory budget, parsing and matching run chunk by chunk.
 
-        elif ce_signal == "SELL":
-            required_pe_signal = "BUY"
-            required_index_signal = "SELL"
-            confirmation_type = "CE Bearish Confirmed"
+INPUT_FIELDS = ['symbol', 'tradeNo', 'dateTime', 'signal', 'type']
+RAW_FIELDS = ['dateTime', 'signal', 'type']
+DEFAULT_MEMORY_BUDGET_MB = 256
 
-        else:
-            continue
+# Conservative working set per input row across parse, match and
+# export (measured well under this on synthetic exports); sizes the chunks.
+WORKING_BYTES_PER_ROW = 2048
 
-        pe_candidates = df_pe[
-            (df_pe['entry_signal'] == required_pe_signal) &
-            (abs(df_pe['entry_time'] - ce_time) <= pd.Timedelta('1min'))
-        ]
 
-        index_candidates = df_index[
-            (df_index['entry_signal'] == required_index_signal) &
-            (abs(df_index['entry_time'] - ce_time) <= pd.Timedelta('1min'))
-        ]
+def current_rss_mb():
 
-        if not pe_candidates.empty and not index_candidates.empty:
+    # Resident size of this process right now (None without /proc). Other
+    # requests in the same worker count too.
+    try:
+        with open("/proc/self/statm") as f:
+            pages = int(f.read().split()[1])
+    except OSError:
+        return None
 
-            pe = pe_candidates.iloc[0]
-            index_row = index_candidates.iloc[0]
+    return round(pages * os.sysconf("SC_PAGE_SIZE") / 1024 / 1024, 1)
 
-            pe_used.add(pe.name)
 
-            matched.append({
+# How often the fallback sampler reads the resident size.
+RSS_SAMPLE_SECONDS = 0.05
 
-                "CE Symbol": ce.get('symbol'),
-                "CE TradeNo": ce.get('tradeNo'),
-                "CE Signal": ce_signal,
-                "CE Time": ce_time.strftime("%d-%m-%Y %H:%M:%S"),
+peak_rss_lock = threading.Lock()
+runs_in_flight = 0
+peak_rss_resettable = False
 
-                "PE Symbol": pe.get('symbol'),
-                "PE TradeNo": pe.get('tradeNo'),
-                "PE Signal": required_pe_signal,
-                "PE Time": pe['entry_time'].strftime("%d-%m-%Y %H:%M:%S"),
 
-                "INDEX Symbol": index_row.get('symbol'),
-                "INDEX TradeNo": index_row.get('tradeNo'),
-                "INDEX Signal": required_index_signal,
-                "INDEX Time": index_row['entry_time'].strftime("%d-%m-%Y %H:%M:%S"),
+def reset_peak_rss():
 
-                "Confirmation Type": confirmation_type,
-                "Status": "VALID"
-            })
+    # Linux: writing "5" to clear_refs resets VmHWM to the current resident
+    # size. False where the kernel (or the OS) doesn't allow it.
+    try:
+        with open("/proc/self/clear_refs", "w") as f:
+            f.write("5")
+    except OSError:
+        return False
 
-        else:
-            ce_unmatched.append({
-                "CE Symbol": ce.get('symbol'),
-                "CE TradeNo": ce.get('tradeNo'),
-                "Signal": ce_signal,
-                "Time": ce_time.strftime("%d-%m-%Y %H:%M:%S"),
-                "Reason": "PE or INDEX confirmation missing"
-            })
+    return True
 
-    # =============================
-    # PE UNMATCHED
-    # =============================
 
-    pe_unmatched = df_pe[~df_pe.index.isin(pe_used)].copy()
-    pe_unmatched['Time'] = pe_unmatched['entry_time'].dt.strftime("%d-%m-%Y %H:%M:%S")
-    pe_unmatched['Reason'] = "No CE confirmation"
+def peak_rss_since_reset_mb():
 
-    pe_unmatched['PE Symbol'] = pe_unmatched['symbol']
+    # VmHWM from /proc/self/status (None when it can't be read).
+    try:
+        with open("/proc/self/status") as f:
+            for line in f:
+                if line.startswith("VmHWM:"):
+                    return round(int(line.split()[1]) / 1024, 1)
+    except OSError:
+        return None
 
-    pe_unmatched = pe_unmatched[['PE Symbol','tradeNo','entry_signal','trade_type','Time','Reason']]
-    pe_unmatched.columns = ['PE Symbol','PE TradeNo','Signal','Trade Type','Time','Reason']
+    return None
 
-    # =============================
-    # EXPORT FILES
-    # =============================
 
-    matched_df = pd.DataFrame(matched)
+class RunPeakRss:
 
-    save_excel(matched_df, os.path.join(valid_dir, "matched_signals.xlsx"))
-    save_excel(pd.DataFrame(ce_unmatched), os.path.join(not_valid_dir, "ce_unmatched.xlsx"))
-    save_excel(pe_unmatched, os.path.join(not_valid_dir, "pe_unmatched.xlsx"))
+    # Tracks the peak resident size while a run is in progress. The
+    # high-water mark is reset when no other run is in flight; an
+    # overlapping run reports the peak since the earliest in-flight run
+    # started, which is never below its own. Where the mark can't be reset,
+    # a side thread samples current_rss_mb() until the run ends.
 
-    # =============================
-    # EXPORT MATCHED JSON
-    # =============================
+    def __init__(self):
+        self.start_mb = None
+        self.resettable = False
+        self.sampled_mb = None
+        self.stop = threading.Event()
+        self.sampler = None
 
-    matched_json_path = os.path.join(valid_dir, "matched_signals.json")
+    def __enter__(self):
+        global runs_in_flight, peak_rss_resettable
 
-    if not matched_df.empty:
-        matched_df.to_json(matched_json_path, orient="records", indent=4)
-    else:
-        with open(matched_json_path, "w") as f:
-            f.write("[]")
+        with peak_rss_lock:
+            if runs_in_flight == 0:
+                peak_rss_resettable = reset_peak_rss()
+            self.resettable = peak_rss_resettable
+            runs_in_flight += 1
 
-    # =============================
-    # META JSON FILE
-    # =============================
+        self.start_mb = current_rss_mb()
 
-    meta_json_path = os.path.join(base_dir, "validation_meta.json")
+        if not self.resettable:
+            self.sampled_mb = self.start_mb
+            self.sampler = threading.Thread(target=self.sample, daemon=True)
+            self.sampler.start()
 
-    meta_data = {
-        "generated_at": datetime.now().strftime("%Y-%m-%d %H:%M:%S"),
+        return self
+
+    def __exit__(self, *exc):
+        global runs_in_flight
+
+        self.stop.set()
+        if self.sampler is not None:
+            self.sampler.join()
+
+        with peak_rss_lock:
+            runs_in_flight -= 1
+
+        return False
+
+    def sample(self):
+        while not self.stop.wait(RSS_SAMPLE_SECONDS):
+            self.record(current_rss_mb())
+
+    def record(self, rss):
+        if rss is not None and (self.sampled_mb is None or rss > self.sampled_mb):
+            self.sampled_mb = rss
+
+    def peak_mb(self):
+
+        # Read while the run is still open, just before its meta is written.
+        if self.resettable:
+            peak = peak_rss_since_reset_mb()
+            if peak is not None:
+                return peak
+
+        self.record(current_rss_mb())
+        return self.sampled_mb
+
+
+
+def chunk_rows_for_budget(total_rows, memory_budget_mb):
+
+    # None when everything fits in one pass.
+    budget_rows = max(int(memory_budget_mb * 1024 * 1024 / WORKING_BYTES_PER_ROW), 1)
+
+    return budget_rows if total_rows > budget_rows else None
+
+
+def lean_frame(records, offset=0):
+    return pd.DataFrame(
+        {field: [row.get(field) for row in records] for field in INPUT_FIELDS},
+        index=pd.RangeIndex(offset, offset + len(records))
+    )
+
+
+def compact_trades(df):
+
+    for name in ('symbol', 'entry_signal', 'trade_type'):
+        df[name] = df[name].astype('category')
+
+    if pd.api.types.is_integer_dtype(df['tradeNo']):
+        df['tradeNo'] = pd.to_numeric(df['tradeNo'], downcast='integer')
+
+    return df
+
+
+def prepare_trades_lean(records, chunk_rows=None):
+
+    # Same rows, order and index labels as prepare_trades(pd.DataFrame(records)).
+    chunk_rows = chunk_rows or max(len(records), 1)
+
+    parts = []
+
+    for start in range(0, len(records), chunk_rows):
+
+        df = lean_frame(records[start:start + chunk_rows], start)
+        parse_trade_columns(df)
+
+        df = df[df['trade_type'].str.contains('Entry', na=False)]
+        parts.append(df.drop(columns=RAW_FIELDS))
+
+    df = pd.concat(parts) if len(parts) > 1 else parts[0]
+
+    return compact_trades(df).sort_values('entry_time', kind="stable")
+
+
+def match_signals_chunked(df_ce, df_pe, df_index, chunks):
+
+    # Sequential version of match_signals_sharded: one chunk's match
+    # intermediates are freed before the next chunk starts.
+    if df_ce.empty or chunks <= 1:
+        return match_signals(df_ce, df_pe, df_index)
+
+    shards = shard_frames(df_ce, df_pe, df_index, SHARD_WINDOW, max_shards=chunks)
+
+    return merge_shard_results([match_signals(*shard) for shard in shards])
+
+
+# =====================================================
+# MAIN VALIDATION FUNCTION
+# =====================================================
+
+# Artifact paths and output formats are in run_layout.
+
+
+def prepare_trades(df, after=None):
+
+    # after: incremental runs drop every row before the leg's watermark
+    # before the remaining columns are parsed. Rows at the watermark are
+    # kept; an export can end mid-minute (see drop_stored).
+    if after is not None:
+        if df.empty:
+            df = pd.DataFrame(columns=['dateTime', 'signal', 'type'], dtype=object)
+        df = df[extract_entry_times(df['dateTime']) >= after].copy()
+
+    parse_trade_columns(df)
+
+    df = df[df['trade_type'].str.contains('Entry', na=False)]
+
+    return df.sort_values('entry_time', kind="stable")
+
+
+def pe_unmatched_table(df_pe, pe_used):
+
+    # Built column by column from the unused rows.
+    rows = df_pe[~df_pe.index.isin(pe_used)]
+
+    return pd.DataFrame({
+        'PE Symbol': column_values(rows, 'symbol'),
+        'PE TradeNo': column_values(rows, 'tradeNo'),
+        'Signal': rows['entry_signal'].to_numpy(),
+        'Trade Type': rows['trade_type'].to_numpy(),
+        'Time': rows['entry_time'].dt.strftime(TIME_FORMAT).to_numpy(),
+        'Reason': "No CE confirmation"
+    })
+
+
+def leg_meta(df_ce, df_pe, df_index):
+
+    return {
         "ce_symbols": sorted(df_ce['symbol'].dropna().unique().tolist()) if not df_ce.empty else [],
         "pe_symbols": sorted(df_pe['symbol'].dropna().unique().tolist()) if not df_pe.empty else [],
         "index_symbols": sorted(df_index['symbol'].dropna().unique().tolist()) if not df_index.empty else [],
@@ -219,17 +630,34 @@ def run_validation(ce_data, pe_data, index_data):
         "index_max_time": df_index['entry_time'].max().strftime("%d-%m-%Y") if not df_index.empty else None,
         "total_ce_entries": len(df_ce),
         "total_pe_entries": len(df_pe),
-        "total_index_entries": len(df_index),
-        "total_valid_matches": len(matched_df)
+        "total_index_entries": len(df_index)
     }
 
-    with open(meta_json_path, "w") as f:
-        json.dump(meta_data, f, indent=4)
+
+def build_artifacts(
+    matched_df,
+    ce_unmatched,
+    pe_unmatched,
+    legs,
+    state,
+    timer,
+    formats,
+    extra_meta=None,
+    low_memory=False,
+    peak_rss=None
+):
+
+    # Shared by full and incremental runs: summary, exports, meta and, when
+    # state is given (run_state), the state later appends pick up from.
+    # legs is leg_meta() output; peak_rss, the run's open RunPeakRss.
+    write_excel = excel_bytes_streaming if low_memory else excel_bytes
 
     # =============================
     # GLOBAL SUMMARY
     # =============================
 
+    total_ce = legs["total_ce_entries"]
+
     summary = pd.DataFrame({
         "Metric": [
             "Total CE Entries",
@@ -241,17 +669,525 @@ def run_validation(ce_data, pe_data, index_data):
             "Match Percentage"
         ],
         "Value": [
-            len(df_ce),
-            len(df_pe),
-            len(df_index),
+            total_ce,
+            legs["total_pe_entries"],
+            legs["total_index_entries"],
             len(matched_df),
             len(ce_unmatched),
             len(pe_unmatched),
-            round((len(matched_df)/len(df_ce))*100,2) if len(df_ce)>0 else 0
+            round((len(matched_df)/total_ce)*100,2) if total_ce>0 else 0
         ]
     })
 
-    save_excel(summary, os.path.join(base_dir, "summary.xlsx"))
+    # =============================
+    # EXPORT FILES
+    # =============================
+
+    artifacts = {}
+
+    with timer.stage("export"):
+
+        if "excel" in formats:
+            artifacts[MATCHED_EXCEL] = write_excel(matched_df)
+            artifacts[CE_UNMATCHED_EXCEL] = write_excel(ce_unmatched)
+            artifacts[PE_UNMATCHED_EXCEL] = write_excel(pe_unmatched)
+            artifacts[SUMMARY_EXCEL] = write_excel(summary)
+
+        if "parquet" in formats:
+            artifacts[MATCHED_PARQUET] = parquet_bytes(matched_df)
+            artifacts[CE_UNMATCHED_PARQUET] = parquet_bytes(ce_unmatched)
+            artifacts[PE_UNMATCHED_PARQUET] = parquet_bytes(pe_unmatched)
+
+        # =============================
+        # EXPORT MATCHED JSON
+        # =============================
+
+        if "json" in formats and low_memory:
+            artifacts[MATCHED_JSON] = records_json_bytes(matched_df)
+
+        elif "json" in formats:
+            if not matched_df.empty:
+                artifacts[MATCHED_JSON] = matched_df.to_json(orient="records", indent=4).encode()
+            else:
+                artifacts[MATCHED_JSON] = b"[]"
+
+        if state is not None:
+            artifacts[STATE_JSON] = state_bytes(
+                {**state, "formats": list(formats), "legs": legs},
+                {"matched": matched_df, "ce_unmatched": ce_unmatched, "pe_unmatched": pe_unmatched}
+            )
+
+    # =============================
+    # META JSON FILE
+    # =============================
+
+    meta_data = {
+        "generated_at": datetime.now().strftime("%Y-%m-%d %H:%M:%S"),
+        **legs,
+        "total_valid_matches": len(matched_df),
+        "formats": list(formats),
+        **(extra_meta or {}),
+        **({"peak_rss_mb": peak_rss.peak_mb()} if peak_rss is not None else {}),
+        # Upload happens after this file is built, so its timing is only
+        # reported on /metrics.
+        **timer.as_dict()
+    }
+
+    artifacts[META_JSON] = json.dumps(meta_data, indent=4).encode()
+
+    return artifacts
+
+
+def build_validation_artifacts(
+    ce_data,
+    pe_data,
+    index_data,
+    timer=None,
+    processes=0,
+    shard_window=SHARD_WINDOW,
+    formats=DEFAULT_FORMATS,
+    low_memory=False,
+    memory_budget_mb=DEFAULT_MEMORY_BUDGET_MB,
+    incremental=False
+):
+
+    # Returns every artifact of a run as {relative path: bytes}, built in
+    # memory so it can go straight to the uploader. Stage timings and row
+    # counts go to the timer and into validation_meta.json. With
+    # processes > 1 matching is sharded by shard_window across a process pool.
+    # low_memory ingests lean, compact frames and works in chunks when the
+    # input is larger than memory_budget_mb allows (see LOW-MEMORY MODE).
+    # incremental adds the state appends need (see INCREMENTAL VALIDATION).
+
+    unknown = set(formats) - set(OUTPUT_FORMATS)
+    if unknown:
+        raise ValueError(f"Unknown output formats: {', '.join(sorted(unknown))}")
+
+    timer = timer or StageTimer()
+
+    with RunPeakRss() as peak_rss:
+
+        timer.rows("ce_input", len(ce_data))
+        timer.rows("pe_input", len(pe_data))
+        timer.rows("index_input", len(index_data))
+
+        extra_meta = {"rss_start_mb": peak_rss.start_mb}
+        chunk_rows = None
+
+        if low_memory:
+            chunk_rows = chunk_rows_for_budget(len(ce_data) + len(pe_data) + len(index_data), memory_budget_mb)
+
+            with timer.stage("parse"):
+                df_ce = prepare_trades_lean(ce_data, chunk_rows)
+                df_pe = prepare_trades_lean(pe_data, chunk_rows)
+                df_index = prepare_trades_lean(index_data, chunk_rows)
+
+            extra_meta["low_memory"] = {
+                "memory_budget_mb": memory_budget_mb,
+                "chunk_rows": chunk_rows,
+                "match_chunks": (
+                    math.ceil((len(df_ce) + len(df_pe) + len(df_index)) / chunk_rows) if chunk_rows else 1
+                )
+            }
+
+        else:
+            with timer.stage("dataframe"):
+                df_ce = pd.DataFrame(ce_data)
+                df_pe = pd.DataFrame(pe_data)
+                df_index = pd.DataFrame(index_data)
+
+            with timer.stage("parse"):
+                df_ce = prepare_trades(df_ce)
+                df_pe = prepare_trades(df_pe)
+                df_index = prepare_trades(df_index)
+
+        with timer.stage("match"):
+            if chunk_rows:
+                # Chunked, never across processes: every worker would hold its
+                # own copy of the frames.
+                matched_df, ce_unmatched, pe_used = match_signals_chunked(
+                    df_ce, df_pe, df_index, extra_meta["low_memory"]["match_chunks"]
+                )
+            elif processes and processes > 1:
+                matched_df, ce_unmatched, pe_used = match_signals_sharded(
+                    df_ce, df_pe, df_index, processes, shard_window
+                )
+            else:
+                matched_df, ce_unmatched, pe_used = match_signals(df_ce, df_pe, df_index)
+
+            # =============================
+            # PE UNMATCHED
+            # =============================
+
+            pe_unmatched = pe_unmatched_table(df_pe, pe_used)
+
+        timer.rows("matched", len(matched_df))
+        timer.rows("ce_unmatched", len(ce_unmatched))
+        timer.rows("pe_unmatched", len(pe_unmatched))
+
+        return build_artifacts(
+            matched_df, ce_unmatched, pe_unmatched,
+            leg_meta(df_ce, df_pe, df_index),
+            run_state({"CE": df_ce, "PE": df_pe, "INDEX": df_index}) if incremental else None,
+            timer, formats, extra_meta, low_memory, peak_rss
+        )
+
+
+# =====================================================
+# STREAMED VALIDATION
+# =====================================================
+#
+# Matches CE rows in time-ordered chunks (like match_signals_chunked) and
+# hands out each chunk's rows as soon as it is matched, so a response can
+# start before the run is done. In order, the pieces make up the same
+# tables build_validation_artifacts writes.
+
+STREAM_WINDOW = "1h"
+STREAM_CHUNK_ROWS = 2000
+
+
+def stream_validation(ce_data, pe_data, index_data, timer=None, incremental=False):
+
+    # Generator: yields ("matched" | "ce_unmatched" | "pe_unmatched",
+    # DataFrame) pieces, then ("run", run) where run holds the
+    # build_artifacts inputs, for persisting the run afterwards. Its
+    # peak_rss_mb covers parsing and matching; persisting runs later.
+    timer = timer or StageTimer()
+
+    with RunPeakRss() as peak_rss:
+
+        timer.rows("ce_input", len(ce_data))
+        timer.rows("pe_input", len(pe_data))
+        timer.rows("index_input", len(index_data))
+
+        with timer.stage("dataframe"):
+            df_ce = pd.DataFrame(ce_data)
+            df_pe = pd.DataFrame(pe_data)
+            df_index = pd.DataFrame(index_data)
+
+        with timer.stage("parse"):
+            df_ce = prepare_trades(df_ce)
+            df_pe = prepare_trades(df_pe)
+            df_index = prepare_trades(df_index)
+
+        if df_ce.empty:
+            shards = [(df_ce, df_pe, df_index)]
+        else:
+            shards = shard_frames(
+                df_ce, df_pe, df_index, STREAM_WINDOW,
+                max_shards=math.ceil(len(df_ce) / STREAM_CHUNK_ROWS)
+            )
+
+        results = []
+
+        for shard in shards:
+
+            with timer.stage("match"):
+                result = match_signals(*shard)
+
+            results.append(result)
+
+            yield "matched", result[0]
+            yield "ce_unmatched", result[1]
+
+        with timer.stage("match"):
+            matched_df, ce_unmatched, pe_used = (
+                results[0] if len(results) == 1 else merge_shard_results(results)
+            )
+
+            pe_unmatched = pe_unmatched_table(df_pe, pe_used)
+
+        timer.rows("matched", len(matched_df))
+        timer.rows("ce_unmatched", len(ce_unmatched))
+        timer.rows("pe_unmatched", len(pe_unmatched))
+
+        yield "pe_unmatched", pe_unmatched
+
+        yield "run", {
+            "matched_df": matched_df,
+            "ce_unmatched": ce_unmatched,
+            "pe_unmatched": pe_unmatched,
+            "legs": leg_meta(df_ce, df_pe, df_index),
+            "state": run_state({"CE": df_ce, "PE": df_pe, "INDEX": df_index}) if incremental else None,
+            "extra_meta": {"rss_start_mb": peak_rss.start_mb, "peak_rss_mb": peak_rss.peak_mb()}
+        }
+
+
+# =====================================================
+# INCREMENTAL VALIDATION
+# =====================================================
+#
+# Incremental runs also store validation_state.json: their result tables,
+# a watermark per leg (its latest entry time) and the parsed rows of each
+# leg near the watermarks. Appending new trades skips each leg's rows
+# before its own watermark, so a leg that lags the others loses nothing.
+# Rows at the watermark minute are kept unless the stored tail already has
+# them (same tradeNo and time), since an export can end mid-minute. Only
+# what the new rows can change is re-matched. With W the earliest leg
+# watermark (no new row is before it) and T the match tolerance:
+#
+#   CE rows after W - 3T    re-matched (a CE row after W - T may confirm
+#                           against new rows; rows after W - 3T are the ones
+#                           that can use a PE row after W - 2T)
+#   PE rows after W - 2T    unmatched status recomputed
+#   leg rows after W - 4T   kept in the state as the matching context
+#
+# Everything earlier is carried over from the stored tables unchanged.
+
+STATE_COLUMNS = ['symbol', 'tradeNo', 'entry_signal', 'trade_type', 'entry_time']
+TAIL_TOLERANCES = 4
+
+
+def table_state(df):
+    return json.loads(df.to_json(orient="split", index=False))
+
+
+def state_bytes(state, tables):
+
+    # The result tables are spliced in as to_json text rather than turned
+    # into Python objects first; on large runs that copy was the peak.
+    parts = [json.dumps(state)[:-1]]
+
+    for name, df in tables.items():
+        parts.append(f', "{name}": {df.to_json(orient="split", index=False)}')
+
+    parts.append("}")
+
+    return "".join(parts).encode()
+
+
+def table_from_state(table):
+    return pd.DataFrame(table["data"], columns=table["columns"])
+
+
+def tail_state(df, since):
+
+    tail = df[[c for c in STATE_COLUMNS if c in df.columns]]
+
+    if since is not None:
+        tail = tail[tail['entry_time'] >= since]
+
+    tail = tail.assign(entry_time=tail['entry_time'].dt.strftime(TIME_FORMAT))
+
+    return table_state(tail)
+
+
+def tail_from_state(table):
+
+    tail = table_from_state(table)
+    tail['entry_time'] = pd.to_datetime(tail['entry_time'], format=TIME_FORMAT)
+
+    return tail
+
+
+def run_state(frames, tolerance=MATCH_TOLERANCE):
+
+    latest = {name: df['entry_time'].max() for name, df in frames.items() if not df.empty}
+
+    # The tail reaches back from the earliest watermark, the lowest point
+    # new rows can start from.
+    since = min(latest.values()) - TAIL_TOLERANCES * tolerance if latest else None
+
+    return {
+        "watermarks": {
+            name: latest[name].strftime(TIME_FORMAT) if name in latest else None
+            for name in frames
+        },
+        "tolerance_seconds": tolerance.total_seconds(),
+        "tail": {name: tail_state(df, since) for name, df in frames.items()}
+    }
+
+
+def state_watermarks(state):
+
+    # {leg: Timestamp or None}. States written before per-leg watermarks
+    # hold one watermark for every leg.
+    watermarks = state.get("watermarks") or dict.fromkeys(state["tail"], state.get("watermark"))
+
+    return {
+        name: pd.to_datetime(value, format=TIME_FORMAT) if value else None
+        for name, value in watermarks.items()
+    }
+
+
+def drop_stored(new, tail):
+
+    # New rows that the stored tail already holds, matched on (tradeNo,
+    # entry_time), are dropped: rows at a leg's watermark minute come back
+    # when the appended data repeats it.
+    key = [column for column in ('tradeNo', 'entry_time') if column in new.columns and column in tail.columns]
+
+    if new.empty or tail.empty:
+        return new
+
+    stored = pd.MultiIndex.from_frame(tail[key])
+
+    return new[~pd.MultiIndex.from_frame(new[key]).isin(stored)]
+
+
+def rows_before(table, column, bound):
+
+    # Stored result rows strictly before bound. No bound means the stored
+    # run had no trades, so nothing is carried over.
+    if bound is None:
+        return table.iloc[:0]
+
+    if table.empty:
+        return table
+
+    return table[pd.to_datetime(table[column], format=TIME_FORMAT) < bound]
+
+
+def concat_tables(old, new):
+
+    # The new part keeps its shape when both are empty, like a full run.
+    parts = [df for df in (old, new) if not df.empty]
+
+    if len(parts) < 2:
+        return parts[0].reset_index(drop=True) if parts else new
+
+    return pd.concat(parts, ignore_index=True)
+
+
+def merge_leg_meta(old, new):
+
+    merged = {}
+
+    for leg in ("ce", "pe", "index"):
+
+        merged[f"{leg}_symbols"] = sorted(set(old[f"{leg}_symbols"]) | set(new[f"{leg}_symbols"]))
+        merged[f"{leg}_min_time"] = old[f"{leg}_min_time"] or new[f"{leg}_min_time"]
+        merged[f"{leg}_max_time"] = new[f"{leg}_max_time"] or old[f"{leg}_max_time"]
+        merged[f"total_{leg}_entries"] = old[f"total_{leg}_entries"] + new[f"total_{leg}_entries"]
+
+    return merged
+
+
+def build_incremental_artifacts(state, ce_data, pe_data, index_data, timer=None, low_memory=False):
+
+    # state: a run's validation_state.json. ce/pe/index data may be the
+    # full history or only the latest trades; each leg's rows before its
+    # watermark, and the ones at it that are already stored, are skipped.
+    # Returns the run's artifacts rebuilt as if the whole history had been
+    # validated at once.
+    if state["tolerance_seconds"] != MATCH_TOLERANCE.total_seconds():
+        raise ValueError("Run was validated with a different match tolerance")
+
+    timer = timer or StageTimer()
+
+    with RunPeakRss() as peak_rss:
+
+        tolerance = MATCH_TOLERANCE
+
+        watermarks = state_watermarks(state)
+        stored = [value for value in watermarks.values() if value is not None]
+        watermark = min(stored) if stored else None
+
+        load = lean_frame if low_memory else pd.DataFrame
+
+        with timer.stage("dataframe"):
+            inputs = {
+                "CE": load(ce_data),
+                "PE": load(pe_data),
+                "INDEX": load(index_data)
+            }
+
+        for name, df in inputs.items():
+            timer.rows(f"{name.lower()}_input", len(df))
+
+        tails = {name: tail_from_state(state["tail"][name]) for name in inputs}
+
+        with timer.stage("parse"):
+            new = {
+                name: drop_stored(prepare_trades(df, after=watermarks[name]), tails[name])
+                for name, df in inputs.items()
+            }
+
+        # A leg that had no trades has no watermark; its new rows must still
+        # not start before the stored context.
+        for name, df in new.items():
+            if watermark is not None and not df.empty and df['entry_time'].min() < watermark:
+                raise ValueError(
+                    f"{name} trades before {watermark.strftime(TIME_FORMAT)} predate the run's "
+                    "incremental state; validate the full history as a new run"
+                )
+
+        timer.rows("ce_appended", len(new["CE"]))
+        timer.rows("pe_appended", len(new["PE"]))
+        timer.rows("index_appended", len(new["INDEX"]))
+
+        with timer.stage("match"):
+
+            # Stored tail (each leg's up to its watermark) then the new rows.
+            frames = {name: concat_tables(tails[name], new[name]) for name in new}
+
+            ce_from = watermark - 3 * tolerance if watermark is not None else None
+            pe_from = watermark - 2 * tolerance if watermark is not None else None
+
+            df_ce = frames["CE"] if ce_from is None else frames["CE"][frames["CE"]['entry_time'] >= ce_from]
+            df_pe = frames["PE"] if pe_from is None else frames["PE"][frames["PE"]['entry_time'] >= pe_from]
+
+            matched_new, ce_unmatched_new, pe_used = match_signals(df_ce, frames["PE"], frames["INDEX"])
+
+            matched_df = concat_tables(
+                rows_before(table_from_state(state["matched"]), "CE Time", ce_from),
+                matched_new
+            )
+            ce_unmatched = concat_tables(
+                rows_before(table_from_state(state["ce_unmatched"]), "Time", ce_from),
+                ce_unmatched_new
+            )
+            pe_unmatched = concat_tables(
+                rows_before(table_from_state(state["pe_unmatched"]), "Time", pe_from),
+                pe_unmatched_table(df_pe, pe_used)
+            )
+
+        timer.rows("matched", len(matched_df))
+        timer.rows("ce_unmatched", len(ce_unmatched))
+        timer.rows("pe_unmatched", len(pe_unmatched))
+
+        # frames hold each leg's latest rows, so a leg without new trades
+        # keeps its watermark.
+        new_state = run_state(frames)
+
+        append = {
+            "rss_start_mb": peak_rss.start_mb,
+            "appended_at": datetime.now().strftime("%Y-%m-%d %H:%M:%S"),
+            "previous_watermarks": {
+                name: value.strftime(TIME_FORMAT) if value is not None else None
+                for name, value in watermarks.items()
+            },
+            "appended_ce_entries": len(new["CE"]),
+            "appended_pe_entries": len(new["PE"]),
+            "appended_index_entries": len(new["INDEX"])
+        }
+
+        return build_artifacts(
+            matched_df, ce_unmatched, pe_unmatched,
+            merge_leg_meta(state["legs"], leg_meta(new["CE"], new["PE"], new["INDEX"])),
+            new_state, timer, state["formats"], append, low_memory, peak_rss
+        )
+
+
+def run_validation(ce_data, pe_data, index_data):
+
+    artifacts = build_validation_artifacts(ce_data, pe_data, index_data)
+
+    base_dir = "validation_output"
+    timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
+
+    # Unique per run, so concurrent validations in the same second do not
+    # write into (or clean up) each other's directory.
+    os.makedirs(base_dir, exist_ok=True)
+    base_dir = tempfile.mkdtemp(prefix=f"validation_{timestamp}_", dir=base_dir)
+
+    for relative_path, content in artifacts.items():
+
+        path = os.path.join(base_dir, *relative_path.split("/"))
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+
+        with open(path, "wb") as f:
+            f.write(content)
 
     # =============================
     # RETURN PATHS
@@ -259,6 +1195,6 @@ def run_validation(ce_data, pe_data, index_data):
 
     return {
         "base_directory": base_dir,
-        "matched_json_file": matched_json_path,
-        "meta_json_file": meta_json_path
-    }
\ No newline at end of file
+        "matched_json_file": os.path.join(base_dir, *MATCHED_JSON.split("/")),
+        "meta_json_file": os.path.join(base_dir, META_JSON)
+    }